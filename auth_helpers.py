@@ -1,32 +1,191 @@
 from functools import wraps
 from flask import request, jsonify
+from sqlalchemy import event
+import datetime
+import hashlib
 import jwt
 import os
+import time
+from extensions import db
 from models import User
+from cache_helpers import TTLCache
+
+# Process-local cache of the fields auth needs, keyed by user id
+auth_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL", "60"))
+)
+
+# Decoded claims keyed by token digest, so a repeat token skips signature verification
+claims_cache = TTLCache(
+    maxsize=int(os.getenv("CLAIMS_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("CLAIMS_CACHE_TTL", "300"))
+)
+
+# Current token_version per user id; a claims-carrying token is only honoured while it matches.
+# Revocation is invalidated in-process only, so other workers keep accepting a
+# revoked token for up to TOKEN_VERSION_CACHE_TTL seconds; keep it short.
+token_version_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("TOKEN_VERSION_CACHE_TTL", "5"))
+)
+
+JWT_TTL_MINUTES = int(os.getenv("JWT_TTL_MINUTES", "60"))
+
+
+def invalidate_auth_cache(user_id):
+    """Drop a user's cached auth fields (call after changing role or superuser status)."""
+    auth_cache.invalidate(user_id)
+    token_version_cache.invalidate(user_id)
+
+
+def issue_token(user):
+    """
+    Signs a short-lived JWT carrying the user's role claims and current
+    token_version, so role checks can be made without loading the user.
+    """
+    return jwt.encode({
+        'user_id': user.id,
+        'role': user.role,
+        'is_superuser': bool(user.is_superuser),
+        'tv': user.token_version or 0,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=JWT_TTL_MINUTES)
+    }, os.getenv('SECRET_KEY'), algorithm='HS256')
+
+
+def _decode_claims(token):
+    digest = hashlib.sha256(token.encode()).hexdigest()
+    claims = claims_cache.get(digest)
+    if claims is None:
+        claims = jwt.decode(token, os.getenv('SECRET_KEY'), algorithms=["HS256"])
+        claims_cache.set(digest, claims)
+    elif claims.get('exp') is not None and claims['exp'] <= time.time():
+        claims_cache.invalidate(digest)
+        raise jwt.ExpiredSignatureError("Signature has expired")
+    return claims
+
+
+def _load_token_version(user_id):
+    return db.session.query(User.token_version).filter(User.id == user_id).scalar()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_on_change(mapper, connection, target):
+    invalidate_auth_cache(target.id)
+
+
+def bearer_token():
+    """The token from the request's "Authorization: Bearer" header, or None."""
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith("Bearer "):
+        return auth_header.split(" ")[1]
+    return None
+
+
+def token_is_current(token):
+    """
+    True while `token` is unexpired and still honoured: its token_version
+    matches the user's, or, for a token without claims, the user still
+    exists. For responses that outlive the request check in token_required,
+    such as streams.
+    """
+    try:
+        data = _decode_claims(token)
+    except jwt.InvalidTokenError:
+        return False
+    user_id = data['user_id']
+    if 'tv' not in data:
+        return auth_cache.get_or_load(
+            user_id,
+            lambda: _load_auth_fields(user_id),
+            should_cache=lambda value: value is not None
+        ) is not None
+    version = token_version_cache.get_or_load(
+        user_id,
+        lambda: _load_token_version(user_id),
+        should_cache=lambda value: value is not None
+    )
+    return version is not None and version == data['tv']
+
+
+def _load_auth_fields(user_id):
+    row = (
+        db.session.query(User.id, User.email, User.role, User.is_superuser)
+        .filter(User.id == user_id)
+        .first()
+    )
+    if not row:
+        return None
+    return {"id": row.id, "email": row.email, "role": row.role, "is_superuser": row.is_superuser}
+
+
+class CurrentUser:
+    """
+    What handlers receive as `current_user`. id, role and is_superuser come
+    from the token claims or the auth cache. Any other attribute, and any
+    assignment, loads the full User row once and delegates to it.
+    """
+
+    def __init__(self, fields):
+        object.__setattr__(self, '_fields', fields)
+        object.__setattr__(self, '_user', None)
+
+    def _load(self):
+        user = object.__getattribute__(self, '_user')
+        if user is None:
+            user = User.query.get(self._fields['id'])
+            object.__setattr__(self, '_user', user)
+        return user
+
+    def __getattr__(self, name):
+        fields = object.__getattribute__(self, '_fields')
+        if name in fields:
+            return fields[name]
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
 
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            if auth_header.startswith("Bearer "):
-                token = auth_header.split(" ")[1]
+        token = bearer_token()
 
         if not token:
             return jsonify({'message': 'Token is missing!'}), 401
 
         try:
-            data = jwt.decode(token, os.getenv('SECRET_KEY'), algorithms=["HS256"])
-            current_user = User.query.get(data['user_id'])
+            data = _decode_claims(token)
+            user_id = data['user_id']
+            if 'tv' in data:
+                # Claims-carrying token: only the token version needs checking
+                version = token_version_cache.get_or_load(
+                    user_id,
+                    lambda: _load_token_version(user_id),
+                    should_cache=lambda value: value is not None
+                )
+                fields = None if version is None else {
+                    "id": user_id, "role": data['role'], "is_superuser": data['is_superuser']
+                }
+            else:
+                version = None
+                fields = auth_cache.get_or_load(
+                    user_id,
+                    lambda: _load_auth_fields(user_id),
+                    should_cache=lambda value: value is not None
+                )
         except Exception as e:
             return jsonify({'message': 'Token is invalid!', 'error': str(e)}), 401
 
-        if not current_user:
+        if not fields:
             return jsonify({'message': 'User not found!'}), 404
 
-        return f(current_user, *args, **kwargs)
+        if version is not None and version != data['tv']:
+            return jsonify({'message': 'Token has been revoked!'}), 401
+
+        return f(CurrentUser(fields), *args, **kwargs)
     return decorated
 
 def admin_required(f):
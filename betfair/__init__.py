@@ -1,3 +1,4 @@
 from .session_manager import BetfairSessionManager
 from .place_bet import BetfairBetPlacer
-from .market_lookup import BetfairMarketLookup
\ No newline at end of file
+from .market_lookup import BetfairMarketLookup
+from .batch_placer import BetfairBatchPlacer
@@ -0,0 +1,109 @@
+import hashlib
+import logging
+from collections import OrderedDict
+from functools import partial
+
+# Exchange limit on instructions per placeOrders request
+MAX_INSTRUCTIONS_PER_CALL = 200
+
+
+class BetfairBatchPlacer:
+    """
+    Places many bets with as few placeOrders round trips as possible.
+
+    Orders are grouped by account and marketId and packed into
+    multi-instruction requests of at most `max_per_call` instructions.
+    Each instruction report is mapped back to the `ref` of the order it
+    came from (typically the UserBet), so callers can update statuses.
+
+    An order is a dict with keys: ref, user_id, market_id, selection_id,
+    side, stake, price.
+    """
+
+    def __init__(self, placers, max_per_call=MAX_INSTRUCTIONS_PER_CALL):
+        # user_id -> BetfairBetPlacer for that account
+        self.placers = placers
+        self.max_per_call = max_per_call
+
+    def group_orders(self, orders):
+        """
+        Returns [(user_id, market_id, [order, ...]), ...] with no group larger
+        than `max_per_call`, preserving the original order of bets.
+        """
+        groups = OrderedDict()
+        for order in orders:
+            groups.setdefault((order["user_id"], order["market_id"]), []).append(order)
+
+        batches = []
+        for (user_id, market_id), grouped in groups.items():
+            for start in range(0, len(grouped), self.max_per_call):
+                batches.append((user_id, market_id, grouped[start:start + self.max_per_call]))
+        return batches
+
+    @staticmethod
+    def customer_ref(market_id, orders):
+        """
+        customerRef for a batch, derived from its market and the refs of its
+        orders: Betfair drops a repeated customerRef within 60 seconds, so
+        only a re-send of exactly the same bets gets the same one.
+        """
+        refs = ",".join(str(o["ref"]) for o in orders)
+        digest = hashlib.sha1(f"{market_id}:{refs}".encode()).hexdigest()
+        return f"XCloud-{digest}"[:32]
+
+    def place_batch(self, user_id, market_id, orders):
+        """
+        Sends one placeOrders call for `orders` and returns
+        {"results": [(ref, result), ...]} with one per-bet result each.
+        """
+        placer = self.placers[user_id]
+        instructions = [
+            placer.build_instruction(o["selection_id"], o["side"], o["stake"], o["price"])
+            for o in orders
+        ]
+        data = placer.place_orders(market_id, instructions, customer_ref=self.customer_ref(market_id, orders))
+
+        if "error" in data:
+            return {"error": data["error"], "results": [(o["ref"], {"error": data["error"]}) for o in orders]}
+
+        if data.get("status") != "SUCCESS":
+            logging.warning("Batch placement on %s for user %s returned %s", market_id, user_id, data.get("status"))
+
+        # Reports come back in the same order as the instructions were sent
+        reports = data.get("instructionReports") or []
+        results = []
+        for index, order in enumerate(orders):
+            report = reports[index] if index < len(reports) else None
+            if report and report.get("status") == "SUCCESS":
+                results.append((order["ref"], {"success": True, "details": report}))
+            else:
+                results.append((order["ref"], {"error": report or data}))
+
+        batch_result = {"results": results}
+        if data.get("status") != "SUCCESS":
+            batch_result["error"] = data.get("errorCode") or data.get("status")
+        return batch_result
+
+    def place(self, orders, engine):
+        """
+        Places all `orders` through `engine` (a PlacementEngine), one task per
+        batch. Returns ([(ref, result), ...], PlacementStats).
+        """
+        tasks = []
+        for user_id, market_id, grouped in self.group_orders(orders):
+            tasks.append((
+                grouped,
+                user_id,
+                partial(self.place_batch, user_id, market_id, grouped)
+            ))
+
+        batch_results, stats = engine.run(tasks)
+
+        results = []
+        for grouped, batch_result in batch_results:
+            if "results" in batch_result:
+                results.extend(batch_result["results"])
+            else:
+                # The task itself raised; fail every bet in the batch
+                results.extend((o["ref"], batch_result) for o in grouped)
+        return results, stats
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from collections import defaultdict
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that queues instead of failing.
+
+    A caller reserves its tokens immediately, letting the balance go
+    negative, then sleeps until its reservation is covered. Callers are
+    served in arrival order and never spin.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def reserve(self, cost=1):
+        """Takes `cost` tokens and returns how long the caller must wait for them."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= cost
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class RequestGovernor:
+    """
+    Paces calls to the exchange so a large run queues instead of hitting
+    exchange throttling. Every call takes a token from its operation's
+    bucket and, when an account is given, from that account's bucket.
+
+    Rates are requests per second. They are set per operation with
+    BETFAIR_RATE_<OPERATION> (e.g. BETFAIR_RATE_PLACEORDERS=20) and per
+    account with BETFAIR_RATE_PER_ACCOUNT.
+    """
+    DEFAULT_OPERATION_RATES = {
+        "placeOrders": 20,
+        "listMarketCatalogue": 10,
+        "listMarketBook": 10,
+        "token": 5,
+        "login": 1,
+    }
+    DEFAULT_ACCOUNT_RATE = 5
+
+    def __init__(self, operation_rates=None, account_rate=None):
+        self.operation_rates = dict(self.DEFAULT_OPERATION_RATES)
+        for operation in self.operation_rates:
+            env_rate = os.getenv(f"BETFAIR_RATE_{operation.upper()}")
+            if env_rate:
+                self.operation_rates[operation] = float(env_rate)
+        self.operation_rates.update(operation_rates or {})
+        self.account_rate = account_rate or float(os.getenv("BETFAIR_RATE_PER_ACCOUNT", self.DEFAULT_ACCOUNT_RATE))
+
+        self._operation_buckets = {}
+        self._account_buckets = {}
+        self._lock = threading.Lock()
+        self._waiting = defaultdict(int)
+        self._requests = defaultdict(int)
+        self._total_wait = defaultdict(float)
+        self._max_wait = defaultdict(float)
+
+    def _bucket(self, buckets, key, rate):
+        with self._lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = TokenBucket(rate)
+            return bucket
+
+    def acquire(self, operation, account=None):
+        """Blocks until `operation` may be sent for `account`; returns seconds waited."""
+        wait = 0.0
+        if account is not None:
+            wait = self._bucket(self._account_buckets, account, self.account_rate).reserve()
+        if operation in self.operation_rates:
+            wait = max(wait, self._bucket(
+                self._operation_buckets, operation, self.operation_rates[operation]
+            ).reserve())
+
+        with self._lock:
+            self._requests[operation] += 1
+            self._total_wait[operation] += wait
+            self._max_wait[operation] = max(self._max_wait[operation], wait)
+            if wait:
+                self._waiting[operation] += 1
+        if wait:
+            try:
+                time.sleep(wait)
+            finally:
+                with self._lock:
+                    self._waiting[operation] -= 1
+        return wait
+
+    def stats(self):
+        """Current queue depth plus request and wait-time totals per operation."""
+        with self._lock:
+            return {
+                "queue_depth": sum(self._waiting.values()),
+                "operations": {
+                    operation: {
+                        "queued": self._waiting[operation],
+                        "requests": count,
+                        "avg_wait_ms": round(self._total_wait[operation] / count * 1000, 1),
+                        "max_wait_ms": round(self._max_wait[operation] * 1000, 1),
+                    }
+                    for operation, count in self._requests.items()
+                }
+            }
+
+
+# Shared by every Betfair client in the process
+governor = RequestGovernor()
@@ -0,0 +1,54 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from betfair.governor import governor
+
+# (connect, read) timeout applied to every Betfair call unless overridden
+CONNECT_TIMEOUT = float(os.getenv("BETFAIR_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("BETFAIR_READ_TIMEOUT", "10"))
+
+# One pool per host (api, identitysso, identitysso-cert); size it to the placement workers
+POOL_CONNECTIONS = int(os.getenv("BETFAIR_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.getenv("BETFAIR_POOL_MAXSIZE", os.getenv("PLACEMENT_MAX_WORKERS", "32")))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the process-wide requests.Session used by every Betfair client.
+    Connections are kept alive and reused, so concurrent placement pays for a
+    TLS handshake once per pooled connection instead of once per call.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # pool_block: wait for a free connection rather than opening throwaway ones
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_CONNECTIONS,
+                    pool_maxsize=POOL_MAXSIZE,
+                    pool_block=True
+                )
+                session.mount("https://", adapter)
+                session.headers.update({
+                    "Accept-Encoding": "gzip, deflate",
+                    "Connection": "keep-alive"
+                })
+                _session = session
+    return _session
+
+
+def post(url, operation=None, account=None, **kwargs):
+    """
+    requests.post over the shared session, with the default timeouts applied.
+    `operation` (and `account`, if the call is on behalf of one) are passed
+    to the request governor, which may queue the call to stay under limits.
+    """
+    if operation:
+        governor.acquire(operation, account)
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    return get_session().post(url, **kwargs)
@@ -0,0 +1,100 @@
+import logging
+import os
+from betfair import http_client
+from cache_helpers import TTLCache
+
+# Shared by every price lookup in the process: prices are the same for all accounts
+price_cache = TTLCache(
+    maxsize=int(os.getenv("PRICE_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("PRICE_CACHE_TTL", "2"))
+)
+
+
+class BetfairPriceLookup:
+    """
+    Fetches best available prices for many markets with as few listMarketBook
+    calls as possible.
+
+    EX_BEST_OFFERS costs 5 data points per market against the exchange's 200
+    point per-request limit, so markets are requested MARKETS_PER_CALL at a
+    time. Results are cached briefly per market and shared by every bet on
+    the same runner.
+    """
+    MARKET_BOOK_URL = "https://api.betfair.com/exchange/betting/rest/v1.0/listMarketBook/"
+    MARKETS_PER_CALL = 40
+
+    def __init__(self, app_key, session_token):
+        self.app_key = app_key
+        self.session_token = session_token
+
+    @staticmethod
+    def cache_stats():
+        """Hit/miss/eviction counters for the shared price cache."""
+        return price_cache.stats()
+
+    def _fetch_market_books(self, market_ids):
+        headers = {
+            'X-Application': self.app_key,
+            'X-Authentication': self.session_token,
+            'Content-Type': 'application/json'
+        }
+
+        params = {
+            "marketIds": market_ids,
+            "priceProjection": {"priceData": ["EX_BEST_OFFERS"], "exBestOffersOverrides": {"bestPricesDepth": 1}}
+        }
+
+        response = http_client.post(
+            self.MARKET_BOOK_URL,
+            operation="listMarketBook",
+            headers=headers,
+            json=params
+        )
+        return response.json()
+
+    @staticmethod
+    def _best_prices(book):
+        """{selection_id: {"BACK": price, "LAY": price}} from one market book."""
+        prices = {}
+        for runner in book.get("runners", []):
+            offers = runner.get("ex", {})
+            to_back = offers.get("availableToBack") or []
+            to_lay = offers.get("availableToLay") or []
+            prices[runner["selectionId"]] = {
+                "BACK": to_back[0]["price"] if to_back else None,
+                "LAY": to_lay[0]["price"] if to_lay else None
+            }
+        return prices
+
+    def get_best_prices(self, market_ids):
+        """
+        Returns {market_id: {selection_id: {"BACK": price, "LAY": price}}}
+        for every market that could be fetched. Markets with a fresh cache
+        entry cost no call. A failed call is logged and its markets are left
+        out of the result.
+        """
+        prices = {}
+        missing = []
+        for market_id in dict.fromkeys(market_ids):
+            cached = price_cache.get(market_id)
+            if cached is not None:
+                prices[market_id] = cached
+            else:
+                missing.append(market_id)
+
+        for start in range(0, len(missing), self.MARKETS_PER_CALL):
+            batch = missing[start:start + self.MARKETS_PER_CALL]
+            try:
+                books = self._fetch_market_books(batch)
+            except Exception:
+                logging.exception("Error fetching market books for %s", batch)
+                continue
+            if not isinstance(books, list):
+                logging.error("Unexpected listMarketBook response: %s", books)
+                continue
+            for book in books:
+                market_prices = self._best_prices(book)
+                price_cache.set(book["marketId"], market_prices)
+                prices[book["marketId"]] = market_prices
+
+        return prices
@@ -1,14 +1,66 @@
-import requests
+import json
 import logging
+import os
+from datetime import timedelta
+from cache_helpers import TTLCache
+from betfair.runner_index import RunnerIndex
+from betfair import http_client
+
+# Shared by every lookup in the process: catalogue data is the same for all accounts
+catalogue_cache = TTLCache(
+    maxsize=int(os.getenv("MARKET_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("MARKET_CACHE_TTL", "300"))
+)
 
 class BetfairMarketLookup:
     MARKET_CATALOGUE_URL = "https://api.betfair.com/exchange/betting/rest/v1.0/listMarketCatalogue/"
+    HORSE_RACING_EVENT_TYPE = "7"
 
     def __init__(self, app_key, session_token):
         self.app_key = app_key
         self.session_token = session_token
 
-    def find_market_and_selection(self, market_filter, horse_name):
+    @classmethod
+    def build_market_filter(cls, course, race_start):
+        """
+        Builds a listMarketCatalogue filter for the WIN market of the race at
+        `course` starting at `race_start` (a naive UTC datetime).
+        """
+        return {
+            "eventTypeIds": [cls.HORSE_RACING_EVENT_TYPE],
+            "marketTypeCodes": ["WIN"],
+            "venues": [course],
+            "marketStartTime": {
+                "from": (race_start - timedelta(minutes=1)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "to": (race_start + timedelta(minutes=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            }
+        }
+
+    @staticmethod
+    def cache_stats():
+        """Hit/miss/eviction counters for the shared market catalogue cache."""
+        return catalogue_cache.stats()
+
+    def get_runner_index(self, market_filter):
+        """
+        Returns a RunnerIndex over the markets matching `market_filter`, served
+        from the shared cache when the same filter was fetched recently.
+        The raw listMarketCatalogue response is returned instead on error.
+        """
+        key = json.dumps(market_filter, sort_keys=True)
+        return catalogue_cache.get_or_load(
+            key,
+            lambda: self._load_runner_index(market_filter),
+            should_cache=lambda index: isinstance(index, RunnerIndex)
+        )
+
+    def _load_runner_index(self, market_filter):
+        data = self._fetch_market_catalogue(market_filter)
+        if not isinstance(data, list):
+            return data
+        return RunnerIndex(data)
+
+    def _fetch_market_catalogue(self, market_filter):
         headers = {
             'X-Application': self.app_key,
             'X-Authentication': self.session_token,
@@ -21,17 +73,27 @@ class BetfairMarketLookup:
             "marketProjection": ["RUNNER_METADATA"]
         }
 
+        response = http_client.post(
+            self.MARKET_CATALOGUE_URL,
+            operation="listMarketCatalogue",
+            headers=headers,
+            json=params
+        )
+        return response.json()
+
+    def find_market_and_selection(self, market_filter, horse_name):
         try:
-            response = requests.post(self.MARKET_CATALOGUE_URL, headers=headers, json=params)
-            data = response.json()
-
-            for market in data:
-                for runner in market.get("runners", []):
-                    if runner["runnerName"].lower() == horse_name.lower():
-                        return {
-                            "market_id": market["marketId"],
-                            "selection_id": runner["selectionId"]
-                        }
+            index = self.get_runner_index(market_filter)
+            if not isinstance(index, RunnerIndex):
+                logging.error("Unexpected listMarketCatalogue response: %s", index)
+                return {"error": index}
+
+            match = index.lookup(horse_name)
+            if match:
+                return {
+                    "market_id": match[0],
+                    "selection_id": match[1]
+                }
 
             return {"error": f"Horse '{horse_name}' not found in available markets."}
         except Exception as e:
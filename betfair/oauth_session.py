@@ -1,7 +1,8 @@
-import requests
 import logging
 import os
+import threading
 from datetime import datetime, timedelta
+from betfair import http_client
 
 class OAuthSessionManager:
     """
@@ -16,15 +17,18 @@ class OAuthSessionManager:
         self.client_secret = os.getenv("BETFAIR_CLIENT_SECRET")
         # Optional callback for committing user updates (e.g., db.session.commit)
         self.commit = commit_func or (lambda: None)
+        # Serialises refreshes when one manager is shared by concurrent placement tasks
+        self._lock = threading.Lock()
 
     def get_access_token(self):
         """
         Returns a valid access token, refreshing it if expired or not present.
         """
-        expiry = self.user.betfair_token_expiry
-        if expiry and expiry > datetime.utcnow() + timedelta(seconds=60):
-            return self.user.betfair_access_token
-        return self.refresh_access_token()
+        with self._lock:
+            expiry = self.user.betfair_token_expiry
+            if expiry and expiry > datetime.utcnow() + timedelta(seconds=60):
+                return self.user.betfair_access_token
+            return self.refresh_access_token()
 
     def refresh_access_token(self):
         """
@@ -43,11 +47,12 @@ class OAuthSessionManager:
         auth = (self.client_id, self.client_secret)
 
         try:
-            response = requests.post(
+            response = http_client.post(
                 self.TOKEN_URL,
+                operation="token",
+                account=self.user.id,
                 data=payload,
-                auth=auth,
-                timeout=10
+                auth=auth
             )
             data = response.json()
             if 'access_token' in data:
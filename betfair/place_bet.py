@@ -1,6 +1,6 @@
-import requests
 import logging
 from betfair.oauth_session import OAuthSessionManager
+from betfair import http_client
 import os
 
 class BetfairBetPlacer:
@@ -11,7 +11,26 @@ class BetfairBetPlacer:
         # OAuthSessionManager will handle refreshing and persisting tokens
         self.session_manager = OAuthSessionManager(user, commit_func=commit_func)
     
-    def place_bet(self, market_id, selection_id, side, stake, price):
+    @staticmethod
+    def build_instruction(selection_id, side, stake, price):
+        return {
+            "selectionId": selection_id,
+            "handicap": 0,
+            "side": side.upper(),  # BACK or LAY
+            "orderType": "LIMIT",
+            "limitOrder": {
+                "size": stake,
+                "price": price,
+                "persistenceType": "LAPSE"
+            }
+        }
+
+    def place_orders(self, market_id, instructions, customer_ref=None):
+        """
+        Sends one placeOrders call carrying every instruction in `instructions`
+        (all for `market_id`). Returns the raw exchange response, or an
+        {"error": ...} dict if the call itself could not be made.
+        """
         # Ensure we have a valid access token (refresh if needed)
         token = self.session_manager.get_access_token()
         if not token:
@@ -25,32 +44,33 @@ class BetfairBetPlacer:
 
         payload = {
             "marketId": market_id,
-            "instructions": [
-                {
-                    "selectionId": selection_id,
-                    "handicap": 0,
-                    "side": side.upper(),  # BACK or LAY
-                    "orderType": "LIMIT",
-                    "limitOrder": {
-                        "size": stake,
-                        "price": price,
-                        "persistenceType": "LAPSE"
-                    }
-                }
-            ],
-            "customerRef": f"XCloud-{self.user.id}"
+            "instructions": instructions,
+            "customerRef": customer_ref or f"XCloud-{self.user.id}"
         }
 
         try:
-            resp = requests.post(self.PLACE_ORDERS_URL, headers=headers, json=payload)
-            data = resp.json()
-
-            if data.get("status") == "SUCCESS":
-                return {"success": True, "details": data}
-
-            logging.warning("Bet placement failed for user %s: %s", self.user.id, data)
-            return {"error": data}
-
+            resp = http_client.post(
+                self.PLACE_ORDERS_URL,
+                operation="placeOrders",
+                account=self.user.id,
+                headers=headers,
+                json=payload
+            )
+            return resp.json()
         except Exception as e:
             logging.exception("Error placing bet via OAuth for user %s", self.user.id)
             return {"error": str(e)}
+
+    def place_bet(self, market_id, selection_id, side, stake, price):
+        data = self.place_orders(
+            market_id,
+            [self.build_instruction(selection_id, side, stake, price)]
+        )
+        if "error" in data:
+            return data
+
+        if data.get("status") == "SUCCESS":
+            return {"success": True, "details": data}
+
+        logging.warning("Bet placement failed for user %s: %s", self.user.id, data)
+        return {"error": data}
@@ -0,0 +1,129 @@
+import logging
+import math
+import os
+import queue
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    # nearest-rank percentile
+    rank = math.ceil(pct / 100.0 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+class PlacementStats:
+    """
+    Timing summary for one engine run: throughput plus p50/p95 task latency.
+    """
+
+    def __init__(self, latencies, elapsed, failed):
+        self.latencies = sorted(latencies)
+        self.elapsed = elapsed
+        self.failed = failed
+
+    @classmethod
+    def combine(cls, runs):
+        """Merges the stats of several runs (e.g. one per chunk) into one summary."""
+        runs = list(runs)
+        return cls(
+            [latency for run in runs for latency in run.latencies],
+            sum(run.elapsed for run in runs),
+            sum(run.failed for run in runs)
+        )
+
+    @property
+    def count(self):
+        return len(self.latencies)
+
+    def to_dict(self):
+        return {
+            "tasks": self.count,
+            "failed": self.failed,
+            "elapsed_s": round(self.elapsed, 3),
+            "throughput_per_s": round(self.count / self.elapsed, 2) if self.elapsed else 0.0,
+            "p50_ms": round(_percentile(self.latencies, 50) * 1000, 1),
+            "p95_ms": round(_percentile(self.latencies, 95) * 1000, 1),
+        }
+
+
+class PlacementEngine:
+    """
+    Runs Betfair network work (market lookups, placeOrders calls) concurrently.
+
+    `max_workers` caps the number of calls in flight across all accounts and
+    `per_user_limit` caps the calls in flight for any single account within
+    a run. Tasks wait in per-account queues and are only handed to the pool,
+    round-robin across accounts, when their account has a free slot, so one
+    user with hundreds of bets cannot occupy every worker.
+    """
+
+    def __init__(self, max_workers=None, per_user_limit=None):
+        self.max_workers = max_workers or int(os.getenv("PLACEMENT_MAX_WORKERS", "32"))
+        self.per_user_limit = per_user_limit or int(os.getenv("PLACEMENT_PER_USER_LIMIT", "4"))
+
+    @staticmethod
+    def _run_task(user_key, func):
+        started = time.perf_counter()
+        try:
+            result = func()
+        except Exception as e:
+            logging.exception("Placement task failed for user %s", user_key)
+            result = {"error": str(e)}
+        return result, time.perf_counter() - started
+
+    def run(self, tasks):
+        """
+        Executes `tasks`, an iterable of (ref, user_key, func) tuples, and
+        returns ([(ref, result), ...], PlacementStats) in submission order.
+        `func` takes no arguments and returns a result dict; a result with an
+        "error" key counts as a failure.
+        """
+        tasks = list(tasks)
+        started = time.perf_counter()
+        if not tasks:
+            return [], PlacementStats([], 0.0, 0)
+
+        waiting = OrderedDict()  # user_key -> deque of task indexes, in submission order
+        for i, (_, user_key, _) in enumerate(tasks):
+            waiting.setdefault(user_key, deque()).append(i)
+        in_flight = defaultdict(int)
+        completed = queue.Queue()
+        outcomes = [None] * len(tasks)
+        workers = min(self.max_workers, len(tasks))
+        running = 0
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while waiting or running:
+                # one task per account per pass, until the pool or every account is full
+                dispatched = True
+                while dispatched and running < workers:
+                    dispatched = False
+                    for user_key in list(waiting):
+                        if running >= workers:
+                            break
+                        if in_flight[user_key] >= self.per_user_limit:
+                            continue
+                        i = waiting[user_key].popleft()
+                        if not waiting[user_key]:
+                            del waiting[user_key]
+                        in_flight[user_key] += 1
+                        running += 1
+                        dispatched = True
+                        future = pool.submit(self._run_task, user_key, tasks[i][2])
+                        future.add_done_callback(lambda f, i=i, user_key=user_key: completed.put((i, user_key, f)))
+
+                i, user_key, future = completed.get()
+                outcomes[i] = future.result()
+                in_flight[user_key] -= 1
+                running -= 1
+
+        results = [(ref, outcome[0]) for (ref, _, _), outcome in zip(tasks, outcomes)]
+        latencies = [outcome[1] for outcome in outcomes]
+        failed = sum(1 for _, result in results if not result or result.get("error"))
+        stats = PlacementStats(latencies, time.perf_counter() - started, failed)
+        logging.info("Placement engine run: %s", stats.to_dict())
+        return results, stats
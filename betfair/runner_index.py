@@ -0,0 +1,83 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+_SADDLE_PREFIX = re.compile(r"^\d+\.\s*")
+_COUNTRY_SUFFIX = re.compile(r"\s*\([a-z]{2,3}\)\s*$")
+_APOSTROPHES = re.compile(r"['‘’`]")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_runner_name(name):
+    """
+    Canonical form of a runner name for matching:
+    "Sea The Stars (IRE)", "sea the  stars" and "1. Sea The Stars" all map to
+    "sea the stars"; "O'Reilly's Dream" maps to "oreillys dream".
+    """
+    name = name or ""
+    if not name.isascii():
+        name = unicodedata.normalize("NFKD", name)
+        name = "".join(c for c in name if not unicodedata.combining(c))
+    name = name.casefold().strip()
+    name = _SADDLE_PREFIX.sub("", name)
+    name = _COUNTRY_SUFFIX.sub("", name)
+    name = _APOSTROPHES.sub("", name)
+    return _NON_ALNUM.sub(" ", name).strip()
+
+
+class RunnerIndex:
+    """
+    Normalized runner name -> (market_id, selection_id) for a set of markets,
+    built once from a listMarketCatalogue response.
+
+    Exact lookups are a single dict probe. When that misses, a fuzzy match
+    is accepted only if it clears FUZZY_CUTOFF and beats the runner-up by
+    MIN_MARGIN. Names are pre-filtered with cheap upper bounds on the score,
+    but only below FUZZY_CUTOFF - MIN_MARGIN, so a near-miss still counts
+    as runner-up. A wrong horse costs more than a failed lookup.
+    """
+    FUZZY_CUTOFF = 0.88
+    MIN_MARGIN = 0.05
+
+    def __init__(self, markets):
+        self._selections = {}
+        for market in markets:
+            for runner in market.get("runners", []):
+                key = normalize_runner_name(runner.get("runnerName"))
+                if key:
+                    self._selections.setdefault(key, (market["marketId"], runner["selectionId"]))
+        self._names = list(self._selections)
+
+    def __len__(self):
+        return len(self._selections)
+
+    def lookup(self, horse_name):
+        """Returns (market_id, selection_id) for `horse_name`, or None."""
+        key = normalize_runner_name(horse_name)
+        if not key:
+            return None
+
+        hit = self._selections.get(key)
+        if hit:
+            return hit
+
+        # Anything scoring at least this much could still be a runner-up that rules out the best
+        floor = self.FUZZY_CUTOFF - self.MIN_MARGIN
+        best_name, best_score, runner_up = None, 0.0, 0.0
+        matcher = SequenceMatcher(b=key, autojunk=False)
+        for name in self._names:
+            # length-only bound on the ratio (real_quick_ratio), without touching the matcher
+            if 2.0 * min(len(name), len(key)) / (len(name) + len(key)) < floor:
+                continue
+            matcher.set_seq1(name)
+            if matcher.quick_ratio() < floor:
+                continue
+            score = matcher.ratio()
+            if score > best_score:
+                best_name, best_score, runner_up = name, score, best_score
+            elif score > runner_up:
+                runner_up = score
+
+        if best_name and best_score >= self.FUZZY_CUTOFF and best_score - runner_up >= self.MIN_MARGIN:
+            return self._selections[best_name]
+        return None
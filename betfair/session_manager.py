@@ -1,5 +1,5 @@
-import requests
 import logging
+from betfair import http_client
 
 class BetfairSessionManager:
     """
@@ -26,12 +26,13 @@ class BetfairSessionManager:
         }
 
         try:
-            response = requests.post(
+            response = http_client.post(
                 self.LOGIN_URL,
+                operation="login",
+                account=self.username,
                 data=payload,
                 headers=headers,
-                cert=(self.cert_path, self.key_path),
-                timeout=10
+                cert=(self.cert_path, self.key_path)
             )
             data = response.json()
             if data.get("status") == "SUCCESS":
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe, size-bounded cache with per-entry TTL expiry and LRU eviction.
+
+    `get_or_load` lets only one thread run the loader for a missing key while
+    other callers for the same key wait for its result, so a burst of lookups
+    for the same race costs a single network call.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._loading = {}           # key -> threading.Lock held by the loading thread
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _get_locked(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._data[key]
+            self.expirations += 1
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def get(self, key, default=None):
+        with self._lock:
+            found, value = self._get_locked(key)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get_or_load(self, key, loader, should_cache=lambda value: True):
+        """
+        Returns the cached value for `key`, calling `loader()` on a miss.
+        Values for which `should_cache(value)` is false (e.g. error responses)
+        are returned but not stored.
+        """
+        with self._lock:
+            found, value = self._get_locked(key)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another thread may have loaded it while we waited
+            with self._lock:
+                found, value = self._get_locked(key)
+            if found:
+                return value
+            try:
+                value = loader()
+                if should_cache(value):
+                    self.set(key, value)
+                return value
+            finally:
+                with self._lock:
+                    if self._loading.get(key) is key_lock:
+                        del self._loading[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
@@ -0,0 +1,60 @@
+import threading
+from sqlalchemy import event
+from extensions import db
+
+
+class QueryCounter:
+    """
+    Counts the SQL statements and commits a job issues on `engine`.
+    Only activity from the thread that entered the counter is recorded, so
+    concurrent requests in the same process don't inflate the numbers.
+
+        with QueryCounter(db.engine) as counter:
+            ...
+        counter.to_dict()  # {"queries": 3, "commits": 1}
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.queries = 0
+        self.commits = 0
+        self._thread_id = None
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread_id:
+            self.queries += 1
+
+    def _on_commit(self, conn):
+        if threading.get_ident() == self._thread_id:
+            self.commits += 1
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        event.listen(self.engine, "commit", self._on_commit)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+        event.remove(self.engine, "commit", self._on_commit)
+        return False
+
+    def to_dict(self):
+        return {"queries": self.queries, "commits": self.commits}
+
+
+def insert_ignoring_conflicts(model):
+    """
+    INSERT for `model` that silently skips rows violating a unique
+    constraint (ON CONFLICT DO NOTHING). Combined with RETURNING it yields
+    only the rows actually inserted. Other dialects than PostgreSQL and
+    SQLite get a plain INSERT, so a conflict raises IntegrityError.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return db.insert(model)
+    return insert(model).on_conflict_do_nothing()
@@ -2,6 +2,12 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+import limiter_storage  # registers the shared "sqlite" storage and "token-bucket" strategy
+import os
 
 db      = SQLAlchemy()
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=os.getenv("RATELIMIT_STORAGE_URI", "sqlite://"),
+    strategy=os.getenv("RATELIMIT_STRATEGY", "token-bucket")
+)
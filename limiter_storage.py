@@ -0,0 +1,159 @@
+# limiter_storage.py
+# Rate-limit state shared by all worker processes on one host, kept in a
+# SQLite file in WAL mode. Importing this module registers the "sqlite"
+# storage scheme (sqlite:////abs/path.db, like SQLAlchemy) and the
+# "token-bucket" strategy with `limits`.
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+from limits.storage import Storage
+from limits.strategies import RateLimiter, STRATEGIES
+from limits.util import WindowStats
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL);
+"""
+
+
+class SQLiteStorage(Storage):
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        # sqlite:///relative.db or sqlite:////absolute.db, as in SQLAlchemy URLs
+        path = urlparse(uri or "sqlite://").path[1:]
+        self.path = path or os.path.join(tempfile.gettempdir(), "xcloudbot-ratelimit.db")
+        self._local = threading.local()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _conn(self):
+        # One connection per thread (and per process: connections never cross a fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # -- counter API used by the built-in window strategies --
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                """
+                INSERT INTO counters (key, value, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = CASE WHEN expires_at <= ? THEN excluded.value ELSE value + excluded.value END,
+                    expires_at = CASE WHEN expires_at <= ? OR ? THEN excluded.expires_at ELSE expires_at END
+                """,
+                (key, amount, now + expiry, now, now, 1 if elastic_expiry else 0)
+            )
+            value = conn.execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM counters WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self._conn().execute("SELECT expires_at FROM counters WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else int(time.time())
+
+    def check(self):
+        try:
+            self._conn().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        conn = self._conn()
+        count = conn.execute("SELECT (SELECT COUNT(*) FROM counters) + (SELECT COUNT(*) FROM buckets)").fetchone()[0]
+        conn.execute("DELETE FROM counters")
+        conn.execute("DELETE FROM buckets")
+        return count
+
+    def clear(self, key):
+        conn = self._conn()
+        conn.execute("DELETE FROM counters WHERE key = ?", (key,))
+        conn.execute("DELETE FROM buckets WHERE key = ?", (key,))
+
+    # -- token bucket --
+
+    def acquire_tokens(self, key, capacity, period, cost=1):
+        """
+        Takes `cost` tokens from the bucket for `key` (size `capacity`,
+        refilled at capacity/period per second) if enough are available.
+        Returns (allowed, tokens left, seconds until a token is available).
+        A cost of 0 only peeks.
+        """
+        now = time.time()
+        rate = capacity / float(period)
+        conn = self._conn()
+        # Peeks read without taking the write lock
+        if cost:
+            conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            allowed = tokens >= cost
+            if allowed and cost:
+                tokens -= cost
+                conn.execute(
+                    "INSERT INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                    (key, tokens, now)
+                )
+            if cost:
+                conn.execute("COMMIT")
+        except Exception:
+            if cost:
+                conn.execute("ROLLBACK")
+            raise
+        wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+        return allowed, tokens, wait
+
+
+class TokenBucketRateLimiter(RateLimiter):
+    """
+    `limits` strategy backed by SQLiteStorage.acquire_tokens: "5 per minute"
+    is a bucket of 5 tokens refilled at 5 per 60 seconds.
+    """
+
+    def _acquire(self, item, identifiers, cost):
+        return self.storage.acquire_tokens(item.key_for(*identifiers), item.amount, item.get_expiry(), cost)
+
+    def hit(self, item, *identifiers, cost=1):
+        allowed, _, _ = self._acquire(item, identifiers, cost)
+        return allowed
+
+    def test(self, item, *identifiers, cost=1):
+        _, tokens, _ = self._acquire(item, identifiers, 0)
+        return tokens >= cost
+
+    def get_window_stats(self, item, *identifiers):
+        _, tokens, wait = self._acquire(item, identifiers, 0)
+        return WindowStats(int(time.time() + wait), int(tokens))
+
+
+STRATEGIES["token-bucket"] = TokenBucketRateLimiter
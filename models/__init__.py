@@ -7,3 +7,4 @@ from .systemfollower import SystemFollower
 from .userbet import UserBet
 from .bet import Bet
 from .tipster_access import TipsterAccess
+from .fanout_job import FanoutJob
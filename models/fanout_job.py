@@ -0,0 +1,35 @@
+from extensions import db
+from datetime import datetime
+
+# Background creation of follower UserBets for a batch of uploaded tips
+class FanoutJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    system_id = db.Column(db.Integer, db.ForeignKey('system.id'), nullable=False)
+    tip_ids = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(20), default='queued', index=True)  # 'queued', 'running', 'done', 'failed'
+    followers_total = db.Column(db.Integer)
+    followers_done = db.Column(db.Integer, default=0)
+    bets_created = db.Column(db.Integer, default=0)
+    last_follower_id = db.Column(db.Integer, default=0)  # keyset position, so a rerun resumes
+    error = db.Column(db.String(255))
+    attempts = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    finished_at = db.Column(db.DateTime)
+
+    system = db.relationship('System')
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "system_id": self.system_id,
+            "status": self.status,
+            "tips": len(self.tip_ids or []),
+            "followers_total": self.followers_total,
+            "followers_done": self.followers_done,
+            "bets_created": self.bets_created,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
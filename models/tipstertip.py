@@ -1,6 +1,8 @@
+import hashlib
 from .systems import System
 from extensions import db
 from datetime import datetime
+from betfair.runner_index import normalize_runner_name
 
 class TipsterTip(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -8,7 +10,51 @@ class TipsterTip(db.Model):
     race_time = db.Column(db.String(20))
     course = db.Column(db.String(100))
     horse = db.Column(db.String(100))
-    stake_type = db.Column(db.String(20))  # 'real' or 'sim'
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    stake_type = db.Column(db.String(20))  # one of STAKE_TYPES
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # sha256 of system, race time, course and horse; makes re-uploading a card a no-op
+    content_key = db.Column(db.String(64), unique=True)
+
+    # Betfair IDs resolved in the background after upload, so placement never has to look them up
+    market_id = db.Column(db.String(20))
+    selection_id = db.Column(db.BigInteger)
+    resolution_status = db.Column(db.String(20), default='pending', index=True)  # 'pending', 'resolved', 'failed', 'duplicate' (never placed)
+    resolution_error = db.Column(db.String(255))
+    resolved_at = db.Column(db.DateTime)
 
     system = db.relationship('System', backref=db.backref('tips', lazy=True))
+
+    STAKE_TYPES = ("real", "sim")
+    RACE_TIME_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%dT%H:%M:%S")
+
+    @classmethod
+    def parse_race_time(cls, value):
+        """Parse a race_time string into a naive UTC datetime (None if unparseable)."""
+        if not value:
+            return None
+        for fmt in cls.RACE_TIME_FORMATS:
+            try:
+                return datetime.strptime(value.strip(), fmt)
+            except ValueError:
+                continue
+        return None
+
+    @classmethod
+    def make_content_key(cls, system_id, race_time, course, horse):
+        """
+        Deterministic key for a tip's content: the same runner in the same
+        race for the same system always gets the same key, however the race
+        time, course or horse name were formatted.
+        """
+        race_start = cls.parse_race_time(race_time)
+        parts = (
+            str(system_id),
+            race_start.strftime("%Y-%m-%d %H:%M") if race_start else (race_time or "").strip(),
+            " ".join((course or "").casefold().split()),
+            normalize_runner_name(horse),
+        )
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    @property
+    def race_start(self):
+        return self.parse_race_time(self.race_time)
@@ -1,7 +1,7 @@
 from datetime import datetime
+from sqlalchemy import event
 from extensions import db
-from cryptography.fernet import Fernet
-import os
+from security.encryption import get_cipher
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -12,40 +12,73 @@ class User(db.Model):
     role = db.Column(db.String(50), nullable=False, default='user')
     is_superuser = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Embedded in issued JWTs; bumping it revokes every token issued before the change
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     systems = db.relationship('System', backref='owner', lazy=True)
 
     # 🔐 OAuth2-based Betfair integration (encrypted tokens)
     _betfair_access_token = db.Column("betfair_access_token", db.String(1000))  # encrypted
     _betfair_refresh_token = db.Column("betfair_refresh_token", db.String(1000))  # encrypted
-    betfair_token_expiry = db.Column(db.DateTime)  # token expiration datetime
+    betfair_token_expiry = db.Column(db.DateTime, index=True)  # token expiration datetime
 
     def _fernet(self):
-        key = os.getenv("ENCRYPTION_KEY")
-        if not key:
-            raise RuntimeError("ENCRYPTION_KEY not set in environment")
-        return Fernet(key.encode())
+        return get_cipher("ENCRYPTION_KEY")
+
+    def _token_memo(self):
+        # ciphertext -> plaintext, kept on the instance so it lasts one session
+        memo = getattr(self, '_decrypted_tokens', None)
+        if memo is None:
+            memo = self._decrypted_tokens = {}
+        return memo
+
+    def _decrypt(self, ciphertext):
+        """
+        Decrypt `ciphertext` at most once per instance. Keying the memo on the
+        ciphertext means a changed token is never served stale.
+        """
+        memo = self._token_memo()
+        if ciphertext not in memo:
+            memo[ciphertext] = self._fernet().decrypt(ciphertext.encode()).decode()
+        return memo[ciphertext]
+
+    def _encrypt(self, token):
+        ciphertext = self._fernet().encrypt(token.encode()).decode()
+        self._token_memo()[ciphertext] = token
+        return ciphertext
 
     @property
     def betfair_access_token(self):
         """Decrypt and return the stored access token."""
         if not self._betfair_access_token:
             return None
-        return self._fernet().decrypt(self._betfair_access_token.encode()).decode()
+        return self._decrypt(self._betfair_access_token)
 
     @betfair_access_token.setter
     def betfair_access_token(self, token: str):
         """Encrypt and store a new access token."""
-        self._betfair_access_token = self._fernet().encrypt(token.encode()).decode()
+        self._betfair_access_token = self._encrypt(token)
 
     @property
     def betfair_refresh_token(self):
         """Decrypt and return the stored refresh token."""
         if not self._betfair_refresh_token:
             return None
-        return self._fernet().decrypt(self._betfair_refresh_token.encode()).decode()
+        return self._decrypt(self._betfair_refresh_token)
 
     @betfair_refresh_token.setter
     def betfair_refresh_token(self, token: str):
         """Encrypt and store a new refresh token."""
-        self._betfair_refresh_token = self._fernet().encrypt(token.encode()).decode()
+        self._betfair_refresh_token = self._encrypt(token)
+
+    def revoke_tokens(self):
+        """Invalidate every JWT issued to this user so far."""
+        self.token_version = (self.token_version or 0) + 1
+
+
+@event.listens_for(User.role, 'set', active_history=True)
+@event.listens_for(User.is_superuser, 'set', active_history=True)
+def _revoke_tokens_on_privilege_change(target, value, oldvalue, initiator):
+    # Tokens carry role claims, so a role change must retire the old tokens
+    if target.id is not None and oldvalue != value:
+        target.revoke_tokens()
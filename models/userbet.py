@@ -3,13 +3,18 @@ from datetime import datetime
 
 class UserBet(db.Model):
     __tablename__ = 'user_bet'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # one bet per follower per tip; inserts racing a concurrent sync or
+        # fan-out skip the conflicting rows (insert_ignoring_conflicts)
+        db.UniqueConstraint('user_id', 'tip_id', name='uq_user_bet_user_tip'),
+        {'extend_existing': True},
+    )
 
     id       = db.Column(db.Integer, primary_key=True)
     user_id  = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     tip_id   = db.Column(db.Integer, db.ForeignKey('tipster_tip.id'), nullable=False)
     stake    = db.Column(db.Float, nullable=False)
-    status   = db.Column(db.String(20), default='pending')  # 'pending', 'placed', etc.
+    status   = db.Column(db.String(20), default='pending')  # 'pending', 'placing' (claimed), 'placed', 'expired'
 
     # renamed backref so it doesn't clash with Bet.simple_bets
     user = db.relationship(
@@ -21,6 +26,73 @@ class UserBet(db.Model):
         backref=db.backref('user_bets_records', lazy=True)
     )
 
+    @staticmethod
+    def claim_pending_chunks(chunk_size=500, tip_ids=None):
+        """
+        Claims pending bets in id order, `chunk_size` at a time, and yields
+        each claimed chunk with its tip and user loaded by one joined query.
+
+        A chunk is claimed by a conditional UPDATE from 'pending' to
+        'placing', committed before the bets are loaded, so two placement
+        runs overlapping (the scheduler and the cron endpoint, or two
+        workers) never both get the same bet. The caller must move every
+        bet it is given out of 'placing'. A bet left there by a crash
+        mid-placement may or may not have reached Betfair, so it is not
+        picked up again automatically.
+        Pass `tip_ids` to restrict the stream to bets on those tips.
+        """
+        from sqlalchemy.orm import contains_eager
+        from .tipstertip import TipsterTip
+        from .user      import User
+
+        last_id = 0
+        while True:
+            candidates = db.select(UserBet.id).where(UserBet.status == 'pending', UserBet.id > last_id)
+            if tip_ids is not None:
+                candidates = candidates.where(UserBet.tip_id.in_(list(tip_ids)))
+            ids = db.session.scalars(candidates.order_by(UserBet.id).limit(chunk_size)).all()
+            if not ids:
+                return
+            last_id = ids[-1]
+
+            claimed = db.session.scalars(
+                db.update(UserBet)
+                .where(UserBet.id.in_(ids), UserBet.status == 'pending')
+                .values(status='placing')
+                .returning(UserBet.id)
+                .execution_options(synchronize_session=False)
+            ).all()
+            db.session.commit()
+            if not claimed:
+                continue
+
+            chunk = (
+                UserBet.query
+                .join(TipsterTip, UserBet.tip_id == TipsterTip.id)
+                .join(User, UserBet.user_id == User.id)
+                .options(contains_eager(UserBet.tip), contains_eager(UserBet.user))
+                .filter(UserBet.id.in_(claimed))
+                .order_by(UserBet.id)
+                .all()
+            )
+            # bets whose tip or user row is gone can't be placed; hand them back
+            # (committed by the caller along with the chunk's statuses)
+            UserBet.bulk_update_status({'pending': list(set(claimed) - {bet.id for bet in chunk})})
+            if chunk:
+                yield chunk
+
+    @staticmethod
+    def bulk_update_status(ids_by_status):
+        """Writes {status: [bet ids]} back with one UPDATE per status."""
+        for status, ids in ids_by_status.items():
+            if ids:
+                db.session.execute(
+                    db.update(UserBet)
+                    .where(UserBet.id.in_(ids))
+                    .values(status=status)
+                    .execution_options(synchronize_session=False)
+                )
+
     @staticmethod
     def get_pending_bets_for_user(user_id):
         from .tipstertip import TipsterTip
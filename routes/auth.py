@@ -1,14 +1,18 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
 from models import User
 from extensions import db, limiter
-import jwt
-import datetime
-import os
+from auth_helpers import issue_token
+from security.passwords import hash_password, verify_password, needs_rehash, PasswordHashBusy
 from flasgger.utils import swag_from
 
 auth_bp = Blueprint('auth', __name__)
 
+
+@auth_bp.errorhandler(PasswordHashBusy)
+def password_hash_busy(e):
+    return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+
+
 @auth_bp.route('/register', methods=['POST'])
 @swag_from({
     'tags': ['Auth'],
@@ -30,7 +34,8 @@ auth_bp = Blueprint('auth', __name__)
     ],
     'responses': {
         200: {'description': 'User registered successfully'},
-        409: {'description': 'Email already exists'}
+        409: {'description': 'Email already exists'},
+        503: {'description': 'Password hashing is busy; retry shortly'}
     }
 })
 def register():
@@ -41,7 +46,7 @@ def register():
     if User.query.filter_by(email=data['email']).first():
         return jsonify({'error': 'Email already registered'}), 409
 
-    hashed_pw = generate_password_hash(data['password'])
+    hashed_pw = hash_password(data['password'])
     new_user = User(email=data['email'], password=hashed_pw, role=data['role'])
 
     db.session.add(new_user)
@@ -70,7 +75,8 @@ def register():
     ],
     'responses': {
         200: {'description': 'JWT token returned'},
-        401: {'description': 'Invalid credentials'}
+        401: {'description': 'Invalid credentials'},
+        503: {'description': 'Password hashing is busy; retry shortly'}
     }
 })
 def login():
@@ -79,12 +85,15 @@ def login():
         return jsonify({'error': 'Missing credentials'}), 400
 
     user = User.query.filter_by(email=data['email']).first()
-    if not user or not check_password_hash(user.password, data['password']):
+    if not user or not verify_password(user.password, data['password']):
         return jsonify({'error': 'Invalid email or password'}), 401
 
-    token = jwt.encode({
-        'user_id': user.id,
-        'exp': datetime.datetime.utcnow() + datetime.timedelta(days=1)
-    }, os.getenv('SECRET_KEY'), algorithm='HS256')
+    # Transparently upgrade hashes made with an older method or cost
+    if needs_rehash(user.password):
+        try:
+            user.password = hash_password(data['password'])
+            db.session.commit()
+        except PasswordHashBusy:
+            pass  # upgraded on a later login
 
-    return jsonify({'token': token})
+    return jsonify({'token': issue_token(user)})
@@ -1,9 +1,8 @@
 from flask import Blueprint
-from extensions import db
-from models import  UserBet, TipsterTip, User
-from betfair import BetfairBetPlacer, BetfairMarketLookup
-from betfair.oauth_session import OAuthSessionManager
-from datetime import datetime
+from services.placement import place_pending_bets as place_pending_bets_job
+from services.tip_resolution import resolve_unresolved_tips
+from services.token_refresh import refresh_expiring_tokens
+from services.fanout import resume_fanout_jobs
 
 cron_bp = Blueprint('cron', __name__)
 
@@ -15,56 +14,21 @@ def place_pending_bets():
       - Automate
     responses:
       200:
-        description: Summary of bet placement attempt
+        description: Summary of bet placement attempt, with throughput and p50/p95 latency
     """
-    now = datetime.utcnow()
-    placed_count = 0
-    failed_count = 0
+    return place_pending_bets_job()
 
-    pending_bets = UserBet.query.filter_by(status='pending').all()
-
-    for bet in pending_bets:
-        tip = TipsterTip.query.get(bet.tip_id)
-        user = User.query.get(bet.user_id)
-
-        if not tip or not user:
-            failed_count += 1
-            continue
-
-        if tip.race_time < now:
-            bet.status = 'expired'
-            db.session.commit()
-            continue
-
-        lookup = BetfairMarketLookup().find_market_and_selection_ids(
-            course=tip.course,
-            race_time=tip.race_time,
-            horse=tip.horse
-        )
-
-        if not lookup:
-            failed_count += 1
-            continue
-
-        placer = BetfairBetPlacer(user)
-        result = placer.place_bet(
-            market_id=lookup['market_id'],
-            selection_id=lookup['selection_id'],
-            side="BACK",
-            stake=bet.stake,
-            price=1.01
-        )
-
-        if result.get("success"):
-            bet.status = "placed"
-            db.session.commit()
-            placed_count += 1
-        else:
-            failed_count += 1
-
-    return {
-        "message": f"{placed_count} bets placed, {failed_count} failed or skipped."
-    }
+@cron_bp.route('/cron/resolve_tips', methods=['POST'])
+def resolve_tips():
+    """
+    ---
+    tags:
+      - Automate
+    responses:
+      200:
+        description: Summary of market/selection resolution retries for upcoming tips
+    """
+    return resolve_unresolved_tips()
 
 @cron_bp.route('/cron/refresh_tokens', methods=['POST'])
 def refresh_all_tokens():
@@ -74,26 +38,18 @@ def refresh_all_tokens():
       - Automate
     responses:
       200:
-        description: Summary of token refresh results
+        description: Summary of token refresh results for accounts expiring within the look-ahead window
     """
-    users = User.query.all()
-    refreshed = 0
-    skipped = 0
-    failed = 0
-
-    for user in users:
-        if not user.betfair_refresh_token:
-            skipped += 1
-            continue
+    return refresh_expiring_tokens()
 
-        session_mgr = OAuthSessionManager(user)
-        new_token = session_mgr.refresh_access_token()
-
-        if new_token:
-            refreshed += 1
-        else:
-            failed += 1
-
-    return {
-        "message": f"{refreshed} tokens refreshed, {skipped} skipped (no refresh token), {failed} failed"
-    }
+@cron_bp.route('/cron/resume_fanout_jobs', methods=['POST'])
+def resume_fanout():
+    """
+    ---
+    tags:
+      - Automate
+    responses:
+      200:
+        description: Summary of re-run fan-out jobs that were lost to a worker restart or had failed
+    """
+    return resume_fanout_jobs()
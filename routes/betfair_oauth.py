@@ -73,10 +73,10 @@ def handle_callback(current_user):
     if 'access_token' not in token_data:
         return jsonify({'error': 'Failed to retrieve tokens', 'details': token_data}), 400
 
-    # Persist tokens (you’ll want to encrypt these!)
-    current_user._betfair_access_token  = token_data['access_token']
-    current_user._betfair_refresh_token = token_data['refresh_token']
-    current_user.betfair_token_expiry   = datetime.utcnow() + timedelta(seconds=int(token_data['expires_in']))
+    # Persist tokens (encrypted by the User setters)
+    current_user.betfair_access_token  = token_data['access_token']
+    current_user.betfair_refresh_token = token_data['refresh_token']
+    current_user.betfair_token_expiry  = datetime.utcnow() + timedelta(seconds=int(token_data['expires_in']))
     db.session.commit()
 
     return jsonify({'message': 'Betfair account successfully connected via OAuth2'}), 200
@@ -84,12 +84,12 @@ def handle_callback(current_user):
 @oauth_bp.route('/refresh', methods=['POST'])
 @token_required
 def refresh_token(current_user):
-    if not current_user._betfair_refresh_token:
+    if not current_user.betfair_refresh_token:
         return jsonify({'error': 'No refresh token stored'}), 400
 
     data = {
         'grant_type': 'refresh_token',
-        'refresh_token': current_user._betfair_refresh_token
+        'refresh_token': current_user.betfair_refresh_token
     }
     try:
         resp = requests.post(
@@ -105,9 +105,10 @@ def refresh_token(current_user):
     if 'access_token' not in tok:
         return jsonify({'error': 'Failed to refresh token', 'details': tok}), 400
 
-    current_user._betfair_access_token  = tok['access_token']
-    current_user._betfair_refresh_token = tok.get('refresh_token', current_user._betfair_refresh_token)
-    current_user.betfair_token_expiry   = datetime.utcnow() + timedelta(seconds=int(tok['expires_in']))
+    current_user.betfair_access_token  = tok['access_token']
+    if 'refresh_token' in tok:
+        current_user.betfair_refresh_token = tok['refresh_token']
+    current_user.betfair_token_expiry  = datetime.utcnow() + timedelta(seconds=int(tok['expires_in']))
     db.session.commit()
 
     return jsonify({'message': 'Betfair token refreshed'}), 200
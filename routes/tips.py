@@ -1,8 +1,12 @@
-from flask import Blueprint, request, jsonify
-from auth_helpers import token_required
+from flask import Blueprint, request, jsonify, make_response, Response, stream_with_context
+from auth_helpers import token_required, bearer_token, token_is_current
 from extensions import db
-from models import TipsterTip, System, User, SystemFollower, UserBet, TipsterAccess
-from datetime import datetime
+from models import TipsterTip, System, TipsterAccess, FanoutJob
+from services.tip_resolution import submit_resolution
+from services.fanout import insert_tips, submit_fanout, sync_system_bets
+from services.tip_import import import_tips, iter_csv, iter_ndjson
+from services.tip_download import get_daily_tips, invalidate_downloads
+from services.tip_stream import stream_tips, publish_tips
 
 tips_bp = Blueprint('tips', __name__)
 
@@ -40,7 +44,10 @@ def upload_tips(current_user):
                     type: string
     responses:
       200:
-        description: Tips uploaded and user bets created
+        description: >
+          Tips uploaded; user bets are created by the returned fan-out job and
+          market/selection IDs are resolved in the background. Tips already
+          uploaded for the system (same race time, course and horse) are skipped.
       400:
         description: Missing system_id or tips
       403:
@@ -63,39 +70,128 @@ def upload_tips(current_user):
     if system.user_id != current_user.id:
         return jsonify({"error": "Unauthorized"}), 403
 
-    followers = SystemFollower.query.filter_by(system_id=system_id).all()
-    created_tips = 0
-    created_user_bets = 0
-
-    for tip in tips:
-        new_tip = TipsterTip(
-            system_id=system_id,
-            race_time=tip["race_time"],
-            course=tip["course"],
-            horse=tip["horse"],
-            stake_type=tip.get("stake_type", "real"),
-        )
-        db.session.add(new_tip)
-        db.session.flush()  # get new_tip.id
-
-        for follower in followers:
-            user_bet = UserBet(
-                user_id=follower.user_id,
-                tip_id=new_tip.id,
-                stake=follower.stake,
-                status="pending"
-            )
-            db.session.add(user_bet)
-            created_user_bets += 1
-
-        created_tips += 1
+    created_tip_ids = insert_tips(system_id, tips)
+    duplicates = len(tips) - len(created_tip_ids)
+    if not created_tip_ids:
+        db.session.rollback()
+        return jsonify({
+            "message": f"0 tips uploaded; {duplicates} were already uploaded.",
+            "fanout_job_id": None
+        })
+
+    job = FanoutJob(system_id=system_id, tip_ids=created_tip_ids)
+    db.session.add(job)
 
     db.session.commit()
+    invalidate_downloads()
+    publish_tips(system_id, created_tip_ids)
+    submit_resolution(created_tip_ids)
+    submit_fanout(job.id)
+
     return jsonify({
-        "message": f"{created_tips} tips uploaded and {created_user_bets} user bets created."
+        "message": f"{len(created_tip_ids)} tips uploaded ({duplicates} already uploaded); "
+                   f"follower bets are being created in the background.",
+        "fanout_job_id": job.id
     })
 
 
+@tips_bp.route('/tips/fanout/<int:job_id>', methods=['GET'])
+@token_required
+def get_fanout_job(current_user, job_id):
+    """
+    ---
+    tags:
+      - Tips
+    parameters:
+      - in: path
+        name: job_id
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Progress of the background job creating follower bets for an upload
+      403:
+        description: Unauthorized
+      404:
+        description: Job not found
+    """
+    job = FanoutJob.query.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    if job.system.user_id != current_user.id:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return jsonify(job.to_dict())
+
+
+@tips_bp.route('/tips/upload/stream', methods=['POST'])
+@token_required
+def upload_tips_stream(current_user):
+    """
+    ---
+    tags:
+      - Tips
+    consumes:
+      - application/x-ndjson
+      - text/csv
+    parameters:
+      - in: body
+        name: body
+        required: true
+        description: >
+          One tip per line, as NDJSON objects or CSV with a header row.
+          Fields are system_id, race_time, course, horse and optional
+          stake_type ("real" or "sim"); every system must belong to the
+          current user. Rows that fail validation are reported, not imported.
+        schema:
+          type: string
+    responses:
+      200:
+        description: Valid rows imported in chunks, with the fan-out job ids creating their bets; per-row errors are listed by line number
+      415:
+        description: Unsupported content type
+    """
+    if request.mimetype == 'text/csv':
+        rows = iter_csv(request.stream)
+    elif request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        rows = iter_ndjson(request.stream)
+    else:
+        return jsonify({"error": "Send application/x-ndjson or text/csv"}), 415
+
+    return jsonify(import_tips(rows, current_user.id))
+
+
+@tips_bp.route('/tips/unresolved', methods=['GET'])
+@token_required
+def list_unresolved_tips(current_user):
+    """
+    ---
+    tags:
+      - Tips
+    responses:
+      200:
+        description: Tips on the current user's systems whose Betfair market or runner could not be resolved
+    """
+    tips = (
+        TipsterTip.query
+        .join(System, TipsterTip.system_id == System.id)
+        .filter(System.user_id == current_user.id, TipsterTip.resolution_status == 'failed')
+        .all()
+    )
+    return jsonify([
+        {
+            "system_id": tip.system_id,
+            "tip_id": tip.id,
+            "race_time": tip.race_time,
+            "course": tip.course,
+            "horse": tip.horse,
+            "error": tip.resolution_error,
+        }
+        for tip in tips
+    ])
+
+
 @tips_bp.route('/tips/sync', methods=['POST'])
 @token_required
 def sync_tips(current_user):
@@ -143,27 +239,7 @@ def sync_tips(current_user):
     if not is_owner and not is_authorized:
         return jsonify({"error": "Unauthorized"}), 403
 
-    tips = TipsterTip.query.filter_by(system_id=system_id).all()
-    followers = SystemFollower.query.filter_by(system_id=system_id).all()
-
-    if not tips or not followers:
-        return jsonify({"message": "No tips or followers found"}), 200
-
-    created_bets = 0
-    for follower in followers:
-        for tip in tips:
-            existing = UserBet.query.filter_by(user_id=follower.user_id, tip_id=tip.id).first()
-            if existing:
-                continue
-            user_bet = UserBet(
-                user_id=follower.user_id,
-                tip_id=tip.id,
-                stake=follower.stake,
-                status="pending"
-            )
-            db.session.add(user_bet)
-            created_bets += 1
-
+    created_bets = sync_system_bets(system_id)
     db.session.commit()
     return jsonify({"message": f"{created_bets} user bets created."})
 
@@ -178,42 +254,50 @@ def download_tips(current_user):
     responses:
       200:
         description: Downloadable tips with authorized access
+      304:
+        description: Not modified since the ETag sent in If-None-Match
     """
-    today = datetime.utcnow().date()
+    body, etag = get_daily_tips(current_user.id)
+    response = make_response(body)
+    response.mimetype = 'application/json'
+    response.set_etag(etag)
+    return response.make_conditional(request)
 
-    followed = SystemFollower.query.filter_by(user_id=current_user.id).all()
-    if not followed:
-        return jsonify([])
 
-    system_ids = [f.system_id for f in followed]
-    stake_map = {f.system_id: f.stake for f in followed}
+@tips_bp.route('/tips/stream', methods=['GET'])
+@token_required
+def stream_new_tips(current_user):
+    """
+    ---
+    tags:
+      - Tips
+    produces:
+      - text/event-stream
+    parameters:
+      - in: header
+        name: Last-Event-ID
+        type: integer
+        required: false
+        description: Id of the last tip received; tips after it are replayed first
+    responses:
+      200:
+        description: >
+          Server-Sent Events stream of new downloadable tips, one "tip" event
+          per tip with the tip id as event id. Replaces polling /tips/download.
+          Ends with an "unauthorized" event once the token expires or is revoked.
+      400:
+        description: Invalid Last-Event-ID
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if last_event_id is not None:
+        try:
+            last_event_id = int(last_event_id)
+        except ValueError:
+            return jsonify({"error": "Invalid Last-Event-ID"}), 400
 
-    tips = (
-        db.session.query(TipsterTip, System)
-        .join(System, TipsterTip.system_id == System.id)
-        .filter(
-            TipsterTip.system_id.in_(system_ids),
-            db.func.date(TipsterTip.created_at) == today
-        )
-        .all()
+    token = bearer_token()
+    return Response(
+        stream_with_context(stream_tips(current_user.id, last_event_id, lambda: token_is_current(token))),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-
-    downloadable = []
-    for tip, system in tips:
-        authorized = TipsterAccess.query.filter_by(
-            tipster_id=system.user_id,
-            user_id=current_user.id
-        ).first()
-
-        if authorized:
-            downloadable.append({
-                "system_id": system.id,
-                "tip_id": tip.id,
-                "race_time": tip.race_time,
-                "course": tip.course,
-                "horse": tip.horse,
-                "stake_type": tip.stake_type,
-                "stake": stake_map.get(system.id, 1.0),
-            })
-
-    return jsonify(downloadable)
@@ -88,10 +88,10 @@ def betfair_callback(current_user):
     if 'access_token' not in tokens:
         return jsonify({'error': 'Failed to retrieve tokens', 'details': tokens}), 400
 
-    # Persist (and encrypt) tokens & expiry
-    current_user._betfair_access_token  = tokens['access_token']
-    current_user._betfair_refresh_token = tokens['refresh_token']
-    current_user.betfair_token_expiry   = datetime.utcnow() + timedelta(seconds=int(tokens['expires_in']))
+    # Persist (and encrypt) tokens & expiry via the User setters
+    current_user.betfair_access_token  = tokens['access_token']
+    current_user.betfair_refresh_token = tokens['refresh_token']
+    current_user.betfair_token_expiry  = datetime.utcnow() + timedelta(seconds=int(tokens['expires_in']))
     db.session.commit()
 
     return jsonify({'message': 'Betfair account connected via OAuth2'}), 200
@@ -109,12 +109,12 @@ def betfair_callback(current_user):
     }
 })
 def betfair_refresh(current_user):
-    if not current_user._betfair_refresh_token:
+    if not current_user.betfair_refresh_token:
         return jsonify({'error': 'No refresh token stored'}), 400
 
     data = {
         'grant_type':    'refresh_token',
-        'refresh_token': current_user._betfair_refresh_token
+        'refresh_token': current_user.betfair_refresh_token
     }
     try:
         resp = requests.post(
@@ -130,9 +130,10 @@ def betfair_refresh(current_user):
     if 'access_token' not in tok:
         return jsonify({'error': 'Failed to refresh token', 'details': tok}), 400
 
-    current_user._betfair_access_token  = tok['access_token']
-    current_user._betfair_refresh_token = tok.get('refresh_token', current_user._betfair_refresh_token)
-    current_user.betfair_token_expiry   = datetime.utcnow() + timedelta(seconds=int(tok['expires_in']))
+    current_user.betfair_access_token  = tok['access_token']
+    if 'refresh_token' in tok:
+        current_user.betfair_refresh_token = tok['refresh_token']
+    current_user.betfair_token_expiry  = datetime.utcnow() + timedelta(seconds=int(tok['expires_in']))
     db.session.commit()
 
     return jsonify({'message': 'Betfair access token refreshed'}), 200
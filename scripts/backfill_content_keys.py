@@ -0,0 +1,22 @@
+import argparse
+import logging
+from app import app
+from services.content_keys import backfill_content_keys
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute content keys for tips uploaded before they existed, merging duplicate tips."
+    )
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    with app.app_context():
+        result = backfill_content_keys(args.chunk_size)
+    logging.info("Done: %s", result)
+
+if __name__ == '__main__':
+    main()
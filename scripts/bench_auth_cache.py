@@ -0,0 +1,56 @@
+"""
+Benchmark: per-request overhead of @token_required with and without the
+authenticated-user cache.
+
+Runs N authenticated requests against a no-op endpoint on an in-memory
+SQLite database. "uncached" clears the auth cache before every request,
+which reproduces the old one-lookup-per-request behaviour.
+
+    python -m scripts.bench_auth_cache [N]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+import jwt
+from app import app
+from extensions import db
+from db_helpers import QueryCounter
+from models import User
+import auth_helpers
+
+
+@app.route('/bench/auth')
+@auth_helpers.token_required
+def bench_auth(current_user):
+    return {"id": current_user.id, "role": current_user.role}
+
+
+def run(n):
+    with app.app_context():
+        db.create_all()
+        user = User(email="bench@example.com", password="x", role="admin")
+        db.session.add(user)
+        db.session.commit()
+        token = jwt.encode({"user_id": user.id}, os.environ["SECRET_KEY"], algorithm="HS256")
+
+        client = app.test_client()
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for label, clear in (("uncached", True), ("cached", False)):
+            auth_helpers.auth_cache.clear()
+            with QueryCounter(db.engine) as counter:
+                started = time.perf_counter()
+                for _ in range(n):
+                    if clear:
+                        auth_helpers.auth_cache.clear()
+                    client.get('/bench/auth', headers=headers)
+                elapsed = time.perf_counter() - started
+            print(f"{label:9s}: {elapsed / n * 1e6:8.1f} us/request, {counter.queries / n:.2f} queries/request")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,59 @@
+"""
+Benchmark: /api/auth/login throughput with N concurrent clients.
+
+Both passes go through the route. "inline" swaps in werkzeug's
+check_password_hash so the KDF runs on the request thread, as login used
+to; "pool" uses the KDF process pool. Runs against an in-memory SQLite
+database with rate limiting disabled.
+
+    python -m scripts.bench_login [clients] [logins_per_client]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+from werkzeug.security import check_password_hash
+from app import app
+from extensions import db, limiter
+from models import User
+from security.passwords import hash_password, verify_password
+import routes.auth as auth_routes
+
+EMAIL = "bench@example.com"
+PASSWORD = "bench-password"
+
+
+def run(clients, per_client):
+    limiter.enabled = False
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(email=EMAIL, password=hash_password(PASSWORD), role="user"))
+        db.session.commit()
+
+    def login_client():
+        client = app.test_client()
+        for _ in range(per_client):
+            resp = client.post('/api/auth/login', json={"email": EMAIL, "password": PASSWORD})
+            assert resp.status_code == 200, resp.get_json()
+
+    total = clients * per_client
+    for label, verify in (("inline", check_password_hash), ("pool", verify_password)):
+        auth_routes.verify_password = verify
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            for future in [executor.submit(login_client) for _ in range(clients)]:
+                future.result()
+        elapsed = time.perf_counter() - started
+        print(f"{label:6s}: {total} logins from {clients} clients in {elapsed:6.2f}s "
+              f"({total / elapsed:7.1f} logins/s)")
+
+
+if __name__ == '__main__':
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    )
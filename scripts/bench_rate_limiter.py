@@ -0,0 +1,53 @@
+"""
+Microbenchmark: per-request cost of the shared SQLite rate-limit storage.
+
+Times the token-bucket check (what every rate-limited request pays) and the
+fixed-window counter, first from one process, then from several processes
+hitting the same file at once, as gunicorn workers would.
+
+    python -m scripts.bench_rate_limiter [calls] [processes]
+"""
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+from limiter_storage import SQLiteStorage
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "xcloudbot-ratelimit-bench.db")
+
+
+def _time_calls(calls):
+    storage = SQLiteStorage(f"sqlite:///{DB_PATH}")
+    started = time.perf_counter()
+    for i in range(calls):
+        storage.acquire_tokens(f"bucket-{os.getpid()}-{i % 100}", 5, 60)
+    bucket = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(calls):
+        storage.incr(f"counter-{os.getpid()}-{i % 100}", 60)
+    counter = time.perf_counter() - started
+    return bucket, counter
+
+
+def run(calls, processes):
+    SQLiteStorage(f"sqlite:///{DB_PATH}").reset()
+
+    bucket, counter = _time_calls(calls)
+    print(f"1 process      : token bucket {bucket / calls * 1e6:7.1f} us/call, "
+          f"fixed window {counter / calls * 1e6:7.1f} us/call")
+
+    with Pool(processes) as pool:
+        results = pool.map(_time_calls, [calls] * processes)
+    bucket = max(r[0] for r in results)
+    counter = max(r[1] for r in results)
+    print(f"{processes} processes    : token bucket {bucket / calls * 1e6:7.1f} us/call, "
+          f"fixed window {counter / calls * 1e6:7.1f} us/call (slowest worker)")
+
+
+if __name__ == '__main__':
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    )
@@ -0,0 +1,102 @@
+"""
+Benchmark: runner-name matching over a full day's racecard.
+
+Builds a synthetic card (MEETINGS x RACES_PER_MEETING races, RUNNERS_PER_RACE
+runners each), then resolves every runner by the name a tipster would type
+using (a) the old linear case-insensitive scan and (b) RunnerIndex.
+Also checks a near-miss regression: two runners within MIN_MARGIN of each
+other must not resolve, even when the second scores under FUZZY_CUTOFF.
+
+    python -m scripts.bench_runner_index
+"""
+import random
+import time
+from betfair.runner_index import RunnerIndex
+
+MEETINGS = 8
+RACES_PER_MEETING = 8
+RUNNERS_PER_RACE = 14
+
+WORDS = [
+    "Sea", "The", "Stars", "Golden", "Horn", "Frankel", "Desert", "Crown", "Dancing", "Brave",
+    "Kingman", "Galileo", "Night", "Shadow", "Silver", "River", "Lady", "Dream", "Storm", "Cat",
+    "Noble", "Mission", "Rock", "Of", "Gibraltar", "Enable", "Baaeed", "Native", "Trail", "Moon",
+]
+SUFFIXES = ["", "", "", " (IRE)", " (FR)", " (GB)", " (USA)"]
+
+
+def build_card(rng):
+    races = []
+    selection_id = 1000
+    for meeting in range(MEETINGS):
+        for race in range(RACES_PER_MEETING):
+            runners = []
+            for _ in range(RUNNERS_PER_RACE):
+                name = " ".join(rng.sample(WORDS, rng.randint(2, 3)))
+                if rng.random() < 0.15:
+                    name = name.replace(" ", "'s ", 1)
+                runners.append({"selectionId": selection_id, "runnerName": name + rng.choice(SUFFIXES)})
+                selection_id += 1
+            races.append([{"marketId": f"1.{meeting}{race:02d}", "runners": runners}])
+    return races
+
+
+def tipster_spelling(name, rng):
+    """How names arrive from uploads: no country suffix, odd casing and spacing."""
+    name = name.split(" (")[0]
+    if rng.random() < 0.5:
+        name = name.upper()
+    if rng.random() < 0.3:
+        name = name.replace(" ", "  ")
+    return name
+
+
+def linear_scan(markets, horse_name):
+    for market in markets:
+        for runner in market.get("runners", []):
+            if runner["runnerName"].lower() == horse_name.lower():
+                return market["marketId"], runner["selectionId"]
+    return None
+
+
+def check_near_miss():
+    """'silver river drummer' scores 0.90 and 'silver riven dreams' 0.872: too close to pick."""
+    index = RunnerIndex([{"marketId": "1.1", "runners": [
+        {"selectionId": 1, "runnerName": "Silver River Drummer"},
+        {"selectionId": 2, "runnerName": "Silver Riven Dreams"},
+    ]}])
+    assert index.lookup("Silver River Dreamer") is None, "ambiguous near-miss resolved to a runner"
+    assert index.lookup("Silver River Drumer") == ("1.1", 1)
+
+
+def run():
+    check_near_miss()
+    rng = random.Random(42)
+    card = build_card(rng)
+    queries = [
+        (markets, tipster_spelling(runner["runnerName"], rng))
+        for markets in card
+        for runner in markets[0]["runners"]
+    ]
+
+    started = time.perf_counter()
+    linear_hits = sum(1 for markets, name in queries if linear_scan(markets, name))
+    linear_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    indexes = [RunnerIndex(markets) for markets in card]
+    build_elapsed = time.perf_counter() - started
+
+    index_by_card = {id(markets): index for markets, index in zip(card, indexes)}
+    started = time.perf_counter()
+    index_hits = sum(1 for markets, name in queries if index_by_card[id(markets)].lookup(name))
+    index_elapsed = time.perf_counter() - started
+
+    print(f"{len(card)} races, {len(queries)} runner lookups")
+    print(f"linear scan : {linear_hits:5d} matched in {linear_elapsed * 1000:8.2f} ms")
+    print(f"RunnerIndex : {index_hits:5d} matched in {index_elapsed * 1000:8.2f} ms "
+          f"(+{build_elapsed * 1000:.2f} ms to build {len(indexes)} indexes)")
+
+
+if __name__ == '__main__':
+    run()
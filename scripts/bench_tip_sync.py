@@ -0,0 +1,61 @@
+"""
+Benchmark: /tips/sync statement count and time as a system grows.
+
+For each size, builds a system with that many followers and tips, deletes
+half of the bets and syncs them back through services.fanout. The
+statement count should be the same at every size.
+
+    python -m scripts.bench_tip_sync [sizes...]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+from app import app
+from extensions import db
+from db_helpers import QueryCounter
+from models import User, System, SystemFollower, UserBet
+from services.fanout import insert_tips, sync_system_bets
+
+
+def _build_system(size):
+    owner = User(email=f"owner{size}@example.com", password="x")
+    db.session.add(owner)
+    db.session.flush()
+    system = System(user_id=owner.id, name=f"Bench {size}", system_type="back", staking_plan="level", bank=100)
+    db.session.add(system)
+    db.session.flush()
+    # follower user ids need not exist: SQLite doesn't enforce the foreign key
+    db.session.execute(db.insert(SystemFollower), [
+        {"user_id": size * 100_000 + i, "system_id": system.id, "stake": 1.0, "bank": 100.0}
+        for i in range(size)
+    ])
+    tip_ids = insert_tips(system.id, [
+        {"race_time": "2030-01-01 14:00", "course": "Ascot", "horse": f"Horse {i}"} for i in range(size)
+    ])
+    sync_system_bets(system.id)
+    # drop every other tip's bets so the sync has gaps to fill
+    db.session.execute(db.delete(UserBet).where(UserBet.tip_id.in_(tip_ids[::2])))
+    db.session.commit()
+    return system.id
+
+
+def run(sizes):
+    with app.app_context():
+        db.create_all()
+        for size in sizes:
+            system_id = _build_system(size)
+            with QueryCounter(db.engine) as counter:
+                started = time.perf_counter()
+                created = sync_system_bets(system_id)
+                db.session.commit()
+                elapsed = time.perf_counter() - started
+            print(f"{size:4d} followers x {size:4d} tips: {created:7d} bets created, "
+                  f"{counter.queries} statements, {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    run([int(arg) for arg in sys.argv[1:]] or [10, 100, 500])
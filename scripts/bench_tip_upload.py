@@ -0,0 +1,79 @@
+"""
+Benchmark: cost of uploading a card of tips to a system with many followers.
+
+"orm" reproduces the old upload path (one flush per tip, one ORM UserBet
+per follower per tip); "bulk" uses services.fanout (one multi-row INSERT
+for the tips, then multi-row INSERTs of the bets built from the cached
+subscription index). Runs on an in-memory SQLite database.
+
+    python -m scripts.bench_tip_upload [followers] [tips]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+from app import app
+from extensions import db
+from db_helpers import QueryCounter
+from models import User, System, SystemFollower, TipsterTip, UserBet
+from services.fanout import insert_tips, fan_out_tips
+
+
+def _orm_upload(system_id, tips):
+    followers = SystemFollower.query.filter_by(system_id=system_id).all()
+    for tip in tips:
+        new_tip = TipsterTip(system_id=system_id, stake_type="real", **tip)
+        db.session.add(new_tip)
+        db.session.flush()
+        for follower in followers:
+            db.session.add(UserBet(user_id=follower.user_id, tip_id=new_tip.id, stake=follower.stake, status="pending"))
+    db.session.commit()
+
+
+def _bulk_upload(system_id, tips):
+    fan_out_tips(system_id, insert_tips(system_id, tips))
+    db.session.commit()
+
+
+def run(followers, tips):
+    card = [
+        {"race_time": f"2030-01-01 {13 + i // 4:02d}:{i % 4 * 15:02d}", "course": "Ascot", "horse": f"Horse {i}"}
+        for i in range(tips)
+    ]
+    with app.app_context():
+        db.create_all()
+        owner = User(email="owner@example.com", password="x")
+        db.session.add(owner)
+        db.session.flush()
+        system = System(user_id=owner.id, name="Bench", system_type="back", staking_plan="level", bank=100)
+        db.session.add(system)
+        db.session.flush()
+        db.session.execute(db.insert(User), [
+            {"email": f"follower{i}@example.com", "password": "x"} for i in range(followers)
+        ])
+        db.session.execute(db.insert(SystemFollower), [
+            {"user_id": owner.id + 1 + i, "system_id": system.id, "stake": 1.0, "bank": 100.0}
+            for i in range(followers)
+        ])
+        db.session.commit()
+
+        for label, upload in (("orm", _orm_upload), ("bulk", _bulk_upload)):
+            before = UserBet.query.count()
+            with QueryCounter(db.engine) as counter:
+                started = time.perf_counter()
+                upload(system.id, card)
+                elapsed = time.perf_counter() - started
+            db.session.expunge_all()
+            created = UserBet.query.count() - before
+            print(f"{label:5s}: {elapsed:7.2f} s, {created} bets, "
+                  f"{counter.queries} statements, {created / elapsed:9.0f} bets/s")
+
+
+if __name__ == '__main__':
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    )
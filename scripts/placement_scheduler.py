@@ -0,0 +1,19 @@
+import logging
+import signal
+from app import app
+from services.scheduler import RaceScheduler
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+
+def main():
+    scheduler = RaceScheduler()
+    signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: scheduler.stop())
+
+    with app.app_context():
+        scheduler.run_forever()
+
+if __name__ == '__main__':
+    main()
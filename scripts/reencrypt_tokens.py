@@ -0,0 +1,24 @@
+import argparse
+import logging
+from app import app
+from services.reencryption import reencrypt_user_tokens
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Encrypt plaintext Betfair tokens and rotate old ciphertext to the newest ENCRYPTION_KEY."
+    )
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--checkpoint", help="checkpoint file (default: REENCRYPT_CHECKPOINT)")
+    parser.add_argument("--restart", action="store_true", help="ignore any existing checkpoint")
+    args = parser.parse_args()
+
+    with app.app_context():
+        result = reencrypt_user_tokens(args.chunk_size, args.checkpoint, args.restart)
+    logging.info("Done: %s", result)
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,42 @@
 # security/encryption.py
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
+from functools import lru_cache
 import os
 
-FERNET_KEY = os.getenv("FERNET_KEY")
-fernet = Fernet(FERNET_KEY.encode())
+
+@lru_cache(maxsize=8)
+def _build_cipher(keys):
+    # Newest key first: it encrypts; every listed key can decrypt
+    return MultiFernet([Fernet(key.strip().encode()) for key in keys.split(",") if key.strip()])
+
+
+def get_cipher(env_var="ENCRYPTION_KEY"):
+    """
+    Returns the MultiFernet for the comma-separated keys in `env_var`, built
+    once per distinct key list. To rotate, prepend the new key and keep the
+    old ones until every stored value has been re-encrypted.
+    """
+    keys = os.getenv(env_var)
+    if not keys:
+        raise RuntimeError(f"{env_var} not set in environment")
+    return _build_cipher(keys)
+
+
+def get_primary_cipher(env_var="ENCRYPTION_KEY"):
+    """The Fernet for the newest key in `env_var` (the one new values are encrypted with)."""
+    keys = os.getenv(env_var)
+    if not keys:
+        raise RuntimeError(f"{env_var} not set in environment")
+    return _build_primary_cipher(keys)
+
+
+@lru_cache(maxsize=8)
+def _build_primary_cipher(keys):
+    return Fernet(keys.split(",")[0].strip().encode())
+
 
 def encrypt(text: str) -> str:
-    return fernet.encrypt(text.encode()).decode()
+    return get_cipher("FERNET_KEY").encrypt(text.encode()).decode()
 
 def decrypt(token: str) -> str:
-    return fernet.decrypt(token.encode()).decode()
+    return get_cipher("FERNET_KEY").decrypt(token.encode()).decode()
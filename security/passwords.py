@@ -0,0 +1,62 @@
+# security/passwords.py
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from functools import lru_cache
+from werkzeug.security import generate_password_hash, check_password_hash
+import os
+import threading
+
+# werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000"
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_pid = None
+
+
+def _get_pool():
+    # Created lazily, and again after a fork, so each server worker owns its pool
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+                _pool_pid = os.getpid()
+    return _pool
+
+
+class PasswordHashBusy(Exception):
+    """The KDF pool did not get to a hash within PASSWORD_HASH_TIMEOUT."""
+
+
+def _run(func, *args):
+    future = _get_pool().submit(func, *args)
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except TimeoutError:
+        # don't leave the work queued behind requests that have given up
+        future.cancel()
+        raise PasswordHashBusy("Password hashing is busy, try again shortly")
+
+
+def hash_password(password: str) -> str:
+    """Hash `password` with the configured method on the KDF process pool."""
+    return _run(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+
+def verify_password(pw_hash: str, password: str) -> bool:
+    """Check `password` against `pw_hash` on the KDF process pool."""
+    return _run(check_password_hash, pw_hash, password)
+
+
+@lru_cache(maxsize=None)
+def _configured_prefix() -> str:
+    # werkzeug fills in defaults ("pbkdf2" -> "pbkdf2:sha256:600000"), so compare
+    # against the prefix of a real hash rather than the setting as written
+    return generate_password_hash("", PASSWORD_HASH_METHOD).split("$", 1)[0]
+
+
+def needs_rehash(pw_hash: str) -> bool:
+    """True if `pw_hash` was made with a method or cost other than the configured one."""
+    return pw_hash.split("$", 1)[0] != _configured_prefix()
@@ -0,0 +1,2 @@
+# services/__init__.py
+# Database-aware jobs shared by the cron routes and the scripts/ entry points.
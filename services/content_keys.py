@@ -0,0 +1,131 @@
+import logging
+from sqlalchemy.orm import aliased
+from extensions import db
+from models import TipsterTip, UserBet, FanoutJob
+
+
+def _has_bet_on(tip_id):
+    """EXISTS clause: the user of the UserBet row being filtered already has a bet on `tip_id`."""
+    other = aliased(UserBet)
+    return db.select(other.id).where(other.user_id == UserBet.user_id, other.tip_id == tip_id).exists()
+
+
+def _merge_duplicate(duplicate_id, canonical_id):
+    """
+    Folds tip `duplicate_id` into `canonical_id`, a tip with the same
+    content. Pending bets that repeat a follower's bet on the canonical tip
+    are deleted; other bets are moved to it. Returns True if the duplicate
+    could then be deleted. If it still holds bets that can't be moved (both
+    tips already placed for the same follower) it is kept for the record,
+    marked 'duplicate' so no further bet on it is resolved or placed, and
+    False is returned.
+    """
+    db.session.execute(
+        db.delete(UserBet)
+        .where(UserBet.tip_id == duplicate_id, UserBet.status == 'pending', _has_bet_on(canonical_id))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        db.update(UserBet)
+        .where(UserBet.tip_id == duplicate_id, ~_has_bet_on(canonical_id))
+        .values(tip_id=canonical_id)
+        .execution_options(synchronize_session=False)
+    )
+    remaining = db.session.query(db.func.count(UserBet.id)).filter(UserBet.tip_id == duplicate_id).scalar()
+    if remaining:
+        logging.warning(
+            "Tip %s duplicates tip %s but %s of its bets clash with bets already made on it; left in place",
+            duplicate_id, canonical_id, remaining
+        )
+        db.session.execute(
+            db.update(TipsterTip)
+            .where(TipsterTip.id == duplicate_id)
+            .values(resolution_status='duplicate', resolution_error=f"Duplicate of tip {canonical_id}")
+            .execution_options(synchronize_session=False)
+        )
+        return False
+    db.session.execute(
+        db.delete(TipsterTip).where(TipsterTip.id == duplicate_id).execution_options(synchronize_session=False)
+    )
+    return True
+
+
+def _repoint_fanout_jobs(system_ids, merged):
+    """Swaps merged tip ids for their canonical tip in fan-out jobs that may still run."""
+    jobs = FanoutJob.query.filter(FanoutJob.system_id.in_(system_ids), FanoutJob.status != 'done')
+    for job in jobs:
+        if any(tip_id in merged for tip_id in job.tip_ids):
+            job.tip_ids = list(dict.fromkeys(merged.get(tip_id, tip_id) for tip_id in job.tip_ids))
+
+
+def backfill_content_keys(chunk_size=500):
+    """
+    One-off job for tips uploaded before content keys existed: computes
+    make_content_key for every tip without one, chunk_size tips per
+    committed transaction, so re-uploading an old card is caught by the
+    unique index too.
+
+    Tips whose content repeats an earlier tip's (the duplicates that
+    re-uploads used to create) are merged into the earliest one: their
+    follower bets move to it, pending bets that repeat a follower's bet on
+    it are deleted, and the duplicate tip is removed. A duplicate whose
+    bets clash with bets already made on the earliest tip is logged, left
+    without a key and marked 'duplicate' so it is never placed again. Safe
+    to re-run.
+    """
+    counts = {"keyed": 0, "merged": 0, "kept": 0}
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(TipsterTip.id, TipsterTip.system_id, TipsterTip.race_time, TipsterTip.course, TipsterTip.horse)
+            .where(TipsterTip.content_key.is_(None), TipsterTip.id > last_id)
+            .order_by(TipsterTip.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        tips_by_key = {}
+        for row in rows:
+            key = TipsterTip.make_content_key(row.system_id, row.race_time, row.course, row.horse)
+            tips_by_key.setdefault(key, []).append(row)
+        keyed = dict(
+            db.session.execute(
+                db.select(TipsterTip.content_key, TipsterTip.id)
+                .where(TipsterTip.content_key.in_(list(tips_by_key)))
+            ).all()
+        )
+
+        updates = []
+        merged = {}
+        system_ids = set()
+        for key, tips in tips_by_key.items():
+            canonical_id = keyed.get(key)
+            if canonical_id is None:
+                canonical_id = tips[0].id
+                updates.append({"b_id": canonical_id, "b_key": key})
+            for tip in tips:
+                if tip.id == canonical_id:
+                    continue
+                if _merge_duplicate(tip.id, canonical_id):
+                    merged[tip.id] = canonical_id
+                    system_ids.add(tip.system_id)
+                else:
+                    counts["kept"] += 1
+
+        table = TipsterTip.__table__
+        if updates:
+            db.session.execute(
+                db.update(table).where(table.c.id == db.bindparam("b_id")).values(content_key=db.bindparam("b_key")),
+                updates
+            )
+        if merged:
+            _repoint_fanout_jobs(system_ids, merged)
+        db.session.commit()
+
+        counts["keyed"] += len(updates)
+        counts["merged"] += len(merged)
+        logging.info("Content keys backfilled up to tip %s: %s", last_id, counts)
+
+    return counts
@@ -0,0 +1,219 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from extensions import db
+from db_helpers import insert_ignoring_conflicts
+from models import TipsterTip, SystemFollower, UserBet, FanoutJob
+from services.subscriptions import get_subscription_index
+
+# Followers handled per committed chunk of a background fan-out job
+CHUNK_SIZE = int(os.getenv("FANOUT_CHUNK_SIZE", "1000"))
+# A queued or running job with no progress for this long is assumed lost (worker restart/crash)
+STALE_SECONDS = int(os.getenv("FANOUT_STALE_SECONDS", "300"))
+# Failed jobs are retried until they have run this many times
+MAX_ATTEMPTS = int(os.getenv("FANOUT_MAX_ATTEMPTS", "5"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("FANOUT_WORKERS", "2")),
+    thread_name_prefix="fanout"
+)
+
+
+def insert_tips(system_id, tips):
+    """
+    Inserts `tips` (dicts with race_time, course, horse and optional
+    stake_type) for `system_id` in one multi-row INSERT and returns the ids
+    of the tips actually created, in upload order. Tips whose content key
+    already exists (a re-uploaded card) are skipped by the unique index.
+    """
+    rows = {}
+    for tip in tips:
+        key = TipsterTip.make_content_key(system_id, tip["race_time"], tip["course"], tip["horse"])
+        rows.setdefault(key, {
+            "system_id": system_id,
+            "race_time": tip["race_time"],
+            "course": tip["course"],
+            "horse": tip["horse"],
+            "stake_type": tip.get("stake_type", "real"),
+            "content_key": key,
+        })
+    if not rows:
+        return []
+    result = db.session.execute(
+        insert_ignoring_conflicts(TipsterTip).returning(TipsterTip.id, TipsterTip.content_key),
+        list(rows.values())
+    )
+    created = dict((key, tip_id) for tip_id, key in result)
+    return [created[key] for key in rows if key in created]
+
+
+def _follower_tip_pairs(system_id):
+    """SELECT of (user_id, tip_id, stake, status) for every follower x tip of a system."""
+    return (
+        db.select(
+            SystemFollower.user_id,
+            TipsterTip.id,
+            SystemFollower.stake,
+            db.literal("pending")
+        )
+        .join(TipsterTip, TipsterTip.system_id == SystemFollower.system_id)
+        .where(SystemFollower.system_id == system_id)
+    )
+
+
+def _missing(pairs):
+    """Narrows a _follower_tip_pairs SELECT to pairs with no UserBet yet."""
+    existing = db.select(UserBet.id).where(
+        UserBet.user_id == SystemFollower.user_id,
+        UserBet.tip_id == TipsterTip.id
+    ).correlate(SystemFollower, TipsterTip)
+    return pairs.where(~existing.exists())
+
+
+def _insert_bets(pairs):
+    """
+    INSERT ... SELECT of `pairs` into user_bet. Pairs that a concurrent sync
+    or job inserted first are skipped by the (user_id, tip_id) constraint
+    instead of failing the statement.
+    """
+    result = db.session.execute(
+        insert_ignoring_conflicts(UserBet).from_select(
+            ["user_id", "tip_id", "stake", "status"], pairs
+        )
+    )
+    return result.rowcount
+
+
+def _insert_follower_bets(followers, tip_ids):
+    """
+    Multi-row INSERT of a pending UserBet for each (follower id, user id,
+    stake) in `followers` on each of `tip_ids`. Bets that already exist are
+    skipped by the (user_id, tip_id) constraint. Returns the number created.
+    """
+    rows = [
+        {"user_id": user_id, "tip_id": tip_id, "stake": stake, "status": "pending"}
+        for _, user_id, stake in followers
+        for tip_id in tip_ids
+    ]
+    if not rows:
+        return 0
+    result = db.session.execute(insert_ignoring_conflicts(UserBet).returning(UserBet.id), rows)
+    return len(result.all())
+
+
+def fan_out_tips(system_id, tip_ids, chunk_size=None):
+    """
+    Creates a pending UserBet for every follower of `system_id` on each of
+    `tip_ids`. Followers and stakes are read from the cached
+    SubscriptionIndex, so no SystemFollower row is loaded; bets are written
+    CHUNK_SIZE followers per INSERT. Returns the number of bets created.
+    """
+    if not tip_ids:
+        return 0
+    index = get_subscription_index(system_id, verify=True)
+    return sum(
+        _insert_follower_bets(followers, tip_ids)
+        for followers in index.chunks(chunk_size or CHUNK_SIZE)
+    )
+
+
+def sync_system_bets(system_id):
+    """
+    Creates the pending UserBets missing for any (follower, tip) pair of
+    `system_id` in one INSERT ... SELECT with an anti-join against
+    user_bet. Returns the number of bets created.
+    """
+    return _insert_bets(_missing(_follower_tip_pairs(system_id)))
+
+
+def run_fanout_job(job_id, chunk_size=None):
+    """
+    Creates the follower bets for a FanoutJob from the system's cached
+    SubscriptionIndex (checked against the database first), CHUNK_SIZE
+    followers at a time. Each chunk's bets and the job's progress are
+    committed together, and bets that already exist are skipped, so a
+    failed or interrupted job resumes after its last committed follower.
+    """
+    job = db.session.get(FanoutJob, job_id)
+    index = get_subscription_index(job.system_id, verify=True)
+    chunks = list(index.chunks(chunk_size or CHUNK_SIZE, after_id=job.last_follower_id or 0))
+    job.status = 'running'
+    job.error = None
+    job.attempts = (job.attempts or 0) + 1
+    job.followers_total = len(index)
+    job.followers_done = len(index) - sum(len(followers) for followers in chunks)
+    db.session.commit()
+
+    try:
+        for followers in chunks:
+            job.bets_created += _insert_follower_bets(followers, job.tip_ids)
+            job.followers_done += len(followers)
+            job.last_follower_id = followers[-1][0]
+            db.session.commit()
+    except Exception as e:
+        logging.exception("Fan-out job %s failed", job_id)
+        db.session.rollback()
+        job.status = 'failed'
+        job.error = str(e)[:255]
+    else:
+        job.status = 'done'
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def _run_in_background(app, job_id):
+    with app.app_context():
+        try:
+            job = run_fanout_job(job_id)
+            logging.info("Fan-out job %s: %s", job_id, job.to_dict())
+        except Exception:
+            logging.exception("Fan-out job %s could not be run", job_id)
+            db.session.rollback()
+
+
+def submit_fanout(job_id):
+    """
+    Queues a committed FanoutJob on the background pool and returns
+    immediately. Must be called from inside a Flask app context.
+    """
+    _executor.submit(_run_in_background, current_app._get_current_object(), job_id)
+
+
+def resume_fanout_jobs(now=None, stale_seconds=None, max_attempts=None):
+    """
+    Re-runs fan-out jobs that will not finish by themselves: queued or
+    running jobs with no progress for `stale_seconds` (their worker was
+    restarted or crashed) and failed jobs with attempts left. Jobs resume
+    from their last committed chunk and already-created bets are skipped.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=stale_seconds or STALE_SECONDS)
+    job_ids = [
+        job_id for (job_id,) in
+        db.session.query(FanoutJob.id)
+        .filter(db.or_(
+            db.and_(FanoutJob.status.in_(('queued', 'running')), FanoutJob.updated_at < cutoff),
+            db.and_(FanoutJob.status == 'failed', FanoutJob.attempts < (max_attempts or MAX_ATTEMPTS))
+        ))
+        .order_by(FanoutJob.id)
+    ]
+
+    done = 0
+    failed = 0
+    for job_id in job_ids:
+        try:
+            job = run_fanout_job(job_id)
+        except Exception:
+            logging.exception("Fan-out job %s could not be resumed", job_id)
+            db.session.rollback()
+            failed += 1
+            continue
+        if job.status == 'done':
+            done += 1
+        else:
+            failed += 1
+
+    return {"message": f"{len(job_ids)} fan-out jobs resumed: {done} done, {failed} failed."}
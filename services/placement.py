@@ -0,0 +1,171 @@
+import logging
+import os
+from datetime import datetime
+from extensions import db
+from db_helpers import QueryCounter
+from models import UserBet
+from betfair import BetfairBetPlacer, BetfairBatchPlacer
+from betfair.market_book import BetfairPriceLookup
+from betfair.governor import governor
+from betfair.placement_engine import PlacementEngine, PlacementStats
+from services.tip_resolution import resolve_tips
+
+CHUNK_SIZE = int(os.getenv("PLACEMENT_CHUNK_SIZE", "500"))
+
+
+def _price_orders(orders, placers):
+    """
+    Fills in each order's price with the best available price for its runner
+    and side, fetched for all of the chunk's markets in as few listMarketBook
+    calls as possible. Returns (priced orders, count of orders left unpriced).
+    """
+    if not orders:
+        return orders, 0
+
+    # Prices are the same for every account; any valid session can fetch them
+    token = None
+    for placer in placers.values():
+        token = placer.session_manager.get_access_token()
+        if token:
+            break
+    if not token:
+        return [], len(orders)
+
+    prices = BetfairPriceLookup(os.getenv("BETFAIR_CLIENT_ID"), token).get_best_prices(
+        [order["market_id"] for order in orders]
+    )
+
+    priced = []
+    for order in orders:
+        price = prices.get(order["market_id"], {}).get(order["selection_id"], {}).get(order["side"])
+        if price is None:
+            logging.warning("No %s price available for selection %s on %s",
+                            order["side"], order["selection_id"], order["market_id"])
+            continue
+        order["price"] = price
+        priced.append(order)
+    return priced, len(orders) - len(priced)
+
+
+def _place_chunk(chunk, engine, now, retry_failed=True):
+    """
+    Places one chunk of pending bets (tip and user already loaded) and
+    returns ({status: [bet ids]}, failed count, PlacementStats). Tips not
+    yet resolved are resolved first; with `retry_failed`, so are tips whose
+    earlier resolution failed.
+    """
+    updates = {"placed": [], "expired": []}
+    failed_count = 0
+
+    candidates = []
+    for bet in chunk:
+        tip = bet.tip
+        if not tip.race_start:
+            failed_count += 1
+            continue
+
+        if tip.race_start < now:
+            updates["expired"].append(bet.id)
+            continue
+
+        candidates.append(bet)
+
+    retry_statuses = (None, 'pending', 'failed') if retry_failed else (None, 'pending')
+    unresolved = {bet.tip.id: bet.tip for bet in candidates if bet.tip.resolution_status in retry_statuses}
+    if unresolved:
+        logging.warning("%s tips reached placement unresolved; resolving now", len(unresolved))
+        resolve_tips(list(unresolved.values()), engine, commit=False)
+
+    placers = {}
+    orders = []
+    for bet in candidates:
+        if bet.tip.resolution_status != 'resolved':
+            failed_count += 1
+            continue
+
+        # One placer per account so concurrent batches share a single token refresh
+        if bet.user_id not in placers:
+            placers[bet.user_id] = BetfairBetPlacer(bet.user)
+
+        orders.append({
+            "ref": bet.id,
+            "user_id": bet.user_id,
+            "market_id": bet.tip.market_id,
+            "selection_id": bet.tip.selection_id,
+            "side": "BACK",
+            "stake": bet.stake,
+            "price": None
+        })
+
+    orders, unpriced = _price_orders(orders, placers)
+    failed_count += unpriced
+
+    results, stats = BetfairBatchPlacer(placers).place(orders, engine)
+
+    for bet_id, result in results:
+        if result.get("success"):
+            updates["placed"].append(bet_id)
+        else:
+            failed_count += 1
+
+    return updates, failed_count, stats
+
+
+def place_pending_bets(engine=None, now=None, chunk_size=None, tip_ids=None, retry_failed=True):
+    """
+    Places every pending UserBet whose race has not started yet.
+
+    Pending bets are claimed (moved to 'placing') a chunk at a time before
+    they are loaded with their tip and user, so overlapping runs never place
+    the same bet twice. Market and selection IDs are read from the tip
+    (resolved after upload). Bets are grouped by account and market into
+    multi-instruction placeOrders calls run concurrently on a
+    PlacementEngine. Each chunk's status changes are written with one
+    UPDATE per status and one commit.
+    Pass `tip_ids` to place only the bets on those tips (e.g. one race),
+    and retry_failed=False if their failed resolutions were just retried.
+    """
+    now = now or datetime.utcnow()
+    engine = engine or PlacementEngine()
+    placed_count = 0
+    failed_count = 0
+    expired_count = 0
+    chunk_stats = []
+
+    with QueryCounter(db.engine) as counter:
+        for chunk in UserBet.claim_pending_chunks(chunk_size or CHUNK_SIZE, tip_ids):
+            bet_ids = [bet.id for bet in chunk]
+            try:
+                updates, failed, stats = _place_chunk(chunk, engine, now, retry_failed)
+            except Exception:
+                # failed before any result came back: release the claim
+                db.session.rollback()
+                UserBet.bulk_update_status({"pending": bet_ids})
+                db.session.commit()
+                raise
+            # bets not placed or expired go back to pending for the next run
+            settled = set(updates["placed"]) | set(updates["expired"])
+            updates["pending"] = [bet_id for bet_id in bet_ids if bet_id not in settled]
+            UserBet.bulk_update_status(updates)
+            db.session.commit()
+
+            placed_count += len(updates["placed"])
+            expired_count += len(updates["expired"])
+            failed_count += failed
+            chunk_stats.append(stats)
+
+    placement_stats = PlacementStats.combine(chunk_stats)
+    logging.info(
+        "Placed %s bets, %s failed, %s expired (%s)",
+        placed_count, failed_count, expired_count, counter.to_dict()
+    )
+
+    return {
+        "message": f"{placed_count} bets placed, {failed_count} failed or skipped, {expired_count} expired.",
+        "stats": {
+            "placement": placement_stats.to_dict(),
+            "price_cache": BetfairPriceLookup.cache_stats(),
+            "governor": governor.stats(),
+            "db": counter.to_dict()
+        }
+    }
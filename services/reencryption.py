@@ -0,0 +1,128 @@
+import base64
+import binascii
+import json
+import logging
+import os
+from cryptography.fernet import InvalidToken
+from extensions import db
+from models import User
+from security.encryption import get_cipher, get_primary_cipher
+
+CHECKPOINT_PATH = os.getenv("REENCRYPT_CHECKPOINT", "reencrypt_tokens.checkpoint.json")
+TOKEN_COLUMNS = (User._betfair_access_token, User._betfair_refresh_token)
+
+
+def _new_checkpoint():
+    return {"last_id": 0, "encrypted": 0, "rotated": 0, "unchanged": 0, "undecryptable": 0, "conflicts": 0}
+
+
+def _load_checkpoint(path):
+    checkpoint = _new_checkpoint()
+    if os.path.exists(path):
+        with open(path) as f:
+            # checkpoints written before a counter existed lack its key
+            checkpoint.update(json.load(f))
+    return checkpoint
+
+
+def _save_checkpoint(path, checkpoint):
+    # Write-then-rename so a crash never leaves a half-written checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def _looks_like_fernet(value):
+    """
+    True if `value` has the shape of a Fernet token: URL-safe base64 of a
+    0x80 version byte, 8-byte timestamp, 16-byte IV, whole AES blocks and a
+    32-byte HMAC.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(value.encode())
+    except (binascii.Error, ValueError):
+        return False
+    return len(raw) >= 73 and raw[0] == 0x80 and (len(raw) - 57) % 16 == 0
+
+
+def _reencrypt_value(value, cipher, primary):
+    """
+    Returns (new value or None if left as is, outcome). Plaintext left
+    behind by the old OAuth callbacks is encrypted. Ciphertext under an older
+    key is rotated to the newest one. Ciphertext that no configured key can
+    decrypt (a key dropped too early, or the wrong ENCRYPTION_KEY) is left
+    alone and counted as undecryptable, never encrypted a second time.
+    """
+    try:
+        primary.decrypt(value.encode())
+        return None, "unchanged"
+    except InvalidToken:
+        pass
+    try:
+        return cipher.rotate(value.encode()).decode(), "rotated"
+    except InvalidToken:
+        if _looks_like_fernet(value):
+            return None, "undecryptable"
+        return cipher.encrypt(value.encode()).decode(), "encrypted"
+
+
+def reencrypt_user_tokens(chunk_size=500, checkpoint_path=None, restart=False):
+    """
+    Streams the users table in id order, `chunk_size` rows at a time, and
+    makes sure every stored Betfair token is ciphertext under the newest
+    ENCRYPTION_KEY.
+
+    Each chunk is one short transaction: a narrow keyset SELECT, then
+    UPDATEs guarded on the old value, so a token refreshed concurrently is
+    skipped and counted as a conflict, never overwritten. After each commit
+    the last processed id is checkpointed, and a rerun resumes from it.
+    Memory use does not grow with the table.
+    """
+    checkpoint_path = checkpoint_path or CHECKPOINT_PATH
+    checkpoint = _new_checkpoint() if restart else _load_checkpoint(checkpoint_path)
+    cipher = get_cipher("ENCRYPTION_KEY")
+    primary = get_primary_cipher("ENCRYPTION_KEY")
+    table = User.__table__
+    columns = [attr.property.columns[0] for attr in TOKEN_COLUMNS]
+
+    while True:
+        rows = db.session.execute(
+            db.select(User.id, *TOKEN_COLUMNS)
+            .where(User.id > checkpoint["last_id"])
+            .order_by(User.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+
+        for index, column in enumerate(columns):
+            updates = []
+            for row in rows:
+                value = row[index + 1]
+                if not value:
+                    continue
+                new_value, outcome = _reencrypt_value(value, cipher, primary)
+                checkpoint[outcome] += 1
+                if outcome == "undecryptable":
+                    logging.error("User %s: %s is encrypted under an unknown key; left unchanged",
+                                  row[0], column.name)
+                if new_value is not None:
+                    updates.append({"b_id": row[0], "b_old": value, "b_new": new_value})
+
+            if updates:
+                result = db.session.execute(
+                    db.update(table)
+                    .where(table.c.id == db.bindparam("b_id"), column == db.bindparam("b_old"))
+                    .values({column: db.bindparam("b_new")}),
+                    updates
+                )
+                if db.engine.dialect.supports_sane_multi_rowcount:
+                    checkpoint["conflicts"] += len(updates) - result.rowcount
+
+        db.session.commit()
+        checkpoint["last_id"] = rows[-1][0]
+        _save_checkpoint(checkpoint_path, checkpoint)
+        logging.info("Re-encrypted users up to id %s: %s", checkpoint["last_id"], checkpoint)
+
+    return checkpoint
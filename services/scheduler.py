@@ -0,0 +1,158 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from extensions import db
+from models import TipsterTip, UserBet, FanoutJob
+from services.placement import place_pending_bets
+from services.tip_resolution import resolve_unresolved_tips
+
+
+class RaceScheduler:
+    """
+    Long-running placement scheduler keyed on race start times.
+
+    Races sit in a min-heap ordered by fire time, which is the race start
+    minus `offset`. The loop sleeps until the next race is due or the next
+    poll, whichever is sooner. Each poll fetches only tips with an id above
+    the highest one already seen, so new uploads are picked up without
+    rescanning the tip table. At fire time only that race's tips are placed.
+    A race that still has pending bets or an unfinished fan-out job after
+    firing is re-armed with a back-off until it starts.
+    """
+
+    def __init__(self, offset_seconds=None, poll_seconds=None, lookback_hours=24, clock=datetime.utcnow):
+        self.offset = timedelta(seconds=offset_seconds or int(os.getenv("PLACEMENT_OFFSET_SECONDS", "120")))
+        self.poll_seconds = poll_seconds or float(os.getenv("SCHEDULER_POLL_SECONDS", "30"))
+        self.lookback = timedelta(hours=lookback_hours)
+        self.retry_seconds = float(os.getenv("SCHEDULER_RETRY_SECONDS", "15"))
+        self.retry_max_seconds = float(os.getenv("SCHEDULER_RETRY_MAX_SECONDS", "60"))
+        self.clock = clock
+
+        self._heap = []                   # (fire_at, seq, race_key)
+        self._seq = itertools.count()
+        self._races = {}                  # race_key -> set of tip ids, while scheduled
+        self._retry_delays = {}           # race_key -> next back-off, for re-armed races
+        self._last_tip_id = None
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def notify(self):
+        """Wakes the loop early to poll for new tips (e.g. right after an upload)."""
+        self._wakeup.set()
+
+    def _schedule(self, race_key, tip_id, now):
+        race_start, _ = race_key
+        if race_key in self._races:
+            self._races[race_key].add(tip_id)
+            return
+        self._races[race_key] = {tip_id}
+        # A tip uploaded inside the offset window fires straight away
+        fire_at = max(race_start - self.offset, now)
+        heapq.heappush(self._heap, (fire_at, next(self._seq), race_key))
+
+    def load_new_tips(self):
+        """Schedules tips uploaded since the last poll; returns how many were seen."""
+        now = self.clock()
+        query = db.session.query(TipsterTip.id, TipsterTip.race_time, TipsterTip.course)
+        if self._last_tip_id is None:
+            # First poll: only tips recent enough to still be upcoming
+            query = query.filter(TipsterTip.created_at >= now - self.lookback)
+        else:
+            query = query.filter(TipsterTip.id > self._last_tip_id)
+        rows = query.order_by(TipsterTip.id).all()
+        db.session.remove()
+
+        for tip_id, race_time, course in rows:
+            self._last_tip_id = tip_id
+            race_start = TipsterTip.parse_race_time(race_time)
+            if race_start and race_start > now:
+                self._schedule((race_start, course), tip_id, now)
+
+        if self._last_tip_id is None:
+            self._last_tip_id = 0
+        return len(rows)
+
+    def _has_outstanding_work(self, tip_ids):
+        """True while the race still has pending bets or a fan-out job that may add some."""
+        pending_bets = db.select(UserBet.id).where(UserBet.tip_id.in_(tip_ids), UserBet.status == 'pending')
+        if db.session.scalar(db.select(pending_bets.exists())):
+            return True
+        system_ids = db.select(TipsterTip.system_id).where(TipsterTip.id.in_(tip_ids))
+        unfinished_jobs = db.select(FanoutJob.id).where(
+            FanoutJob.system_id.in_(system_ids),
+            FanoutJob.status != 'done',
+            FanoutJob.created_at >= self.clock() - self.lookback
+        )
+        return db.session.scalar(db.select(unfinished_jobs.exists()))
+
+    def _fire(self, race_key):
+        tip_ids = self._races[race_key]
+        race_start, course = race_key
+        logging.info("Placing %s tips for %s %s", len(tip_ids), course, race_start)
+        try:
+            # Retry failed resolutions right before placing, while the market is up
+            resolution = resolve_unresolved_tips(tip_ids=tip_ids)
+            logging.info("%s %s: %s", course, race_start, resolution["message"])
+            result = place_pending_bets(tip_ids=tip_ids, retry_failed=False)
+            logging.info("%s %s: %s %s", course, race_start, result["message"], result["stats"])
+        except Exception:
+            logging.exception("Placement failed for %s %s", course, race_start)
+            db.session.rollback()
+
+        try:
+            self._rearm(race_key, self._has_outstanding_work(list(tip_ids)))
+        except Exception:
+            logging.exception("Could not check outstanding bets for %s %s", course, race_start)
+            db.session.rollback()
+            self._rearm(race_key, True)
+        finally:
+            db.session.remove()
+
+    def _rearm(self, race_key, outstanding):
+        """
+        Fires the race again after a back-off (doubling up to
+        RETRY_MAX_SECONDS) while it has outstanding work and hasn't started;
+        otherwise forgets it.
+        """
+        race_start, course = race_key
+        now = self.clock()
+        if not outstanding or race_start <= now:
+            self._races.pop(race_key, None)
+            self._retry_delays.pop(race_key, None)
+            return
+        delay = self._retry_delays.get(race_key, self.retry_seconds)
+        self._retry_delays[race_key] = min(delay * 2, self.retry_max_seconds)
+        fire_at = min(now + timedelta(seconds=delay), race_start)
+        logging.info("%s %s still has bets to place; retrying at %s", course, race_start, fire_at)
+        heapq.heappush(self._heap, (fire_at, next(self._seq), race_key))
+
+    def run_once(self):
+        """Fires every race that is due and returns seconds until the next wake-up."""
+        now = self.clock()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, race_key = heapq.heappop(self._heap)
+            self._fire(race_key)
+
+        if not self._heap:
+            return self.poll_seconds
+        until_next = (self._heap[0][0] - self.clock()).total_seconds()
+        return max(0.0, min(until_next, self.poll_seconds))
+
+    def run_forever(self):
+        """Runs the loop until stop() is called. Needs an app context."""
+        logging.info("Race scheduler started (offset %s, poll %ss)", self.offset, self.poll_seconds)
+        self.load_new_tips()
+        while not self._stopped:
+            timeout = self.run_once()
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+            if not self._stopped:
+                self.load_new_tips()
+        logging.info("Race scheduler stopped")
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+from datetime import datetime, time, timedelta
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from cache_helpers import TTLCache
+from extensions import db
+from models import TipsterTip, System, SystemFollower, TipsterAccess
+
+# One entry per follower per day: (JSON body, ETag). Cleared in-process when
+# tips are uploaded or access/follows change (bulk statements included); other
+# workers catch up within the TTL.
+download_cache = TTLCache(
+    maxsize=int(os.getenv("DOWNLOAD_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("DOWNLOAD_CACHE_TTL", "60"))
+)
+
+
+def invalidate_downloads():
+    download_cache.clear()
+
+
+@event.listens_for(TipsterAccess, "after_insert")
+@event.listens_for(TipsterAccess, "after_delete")
+@event.listens_for(SystemFollower, "after_insert")
+@event.listens_for(SystemFollower, "after_update")
+@event.listens_for(SystemFollower, "after_delete")
+def _access_changed(mapper, connection, target):
+    invalidate_downloads()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bulk_access_changed(orm_execute_state):
+    # Query.delete() and bulk insert/update/delete statements fire no mapper events
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in (TipsterAccess, SystemFollower):
+        invalidate_downloads()
+
+
+def permitted_systems(user_id):
+    """
+    {system_id: stake} for the systems `user_id` follows whose tipster has
+    granted them access, in one query.
+    """
+    rows = (
+        db.session.query(SystemFollower.system_id, SystemFollower.stake)
+        .join(System, SystemFollower.system_id == System.id)
+        .join(TipsterAccess, db.and_(
+            TipsterAccess.tipster_id == System.user_id,
+            TipsterAccess.user_id == user_id
+        ))
+        .filter(SystemFollower.user_id == user_id)
+    )
+    return {system_id: stake for system_id, stake in rows}
+
+
+def tip_payload(tip, stake):
+    return {
+        "system_id": tip.system_id,
+        "tip_id": tip.id,
+        "race_time": tip.race_time,
+        "course": tip.course,
+        "horse": tip.horse,
+        "stake_type": tip.stake_type,
+        "stake": stake,
+    }
+
+
+def _load_daily_tips(user_id, day):
+    stake_map = permitted_systems(user_id)
+    if not stake_map:
+        return []
+
+    start = datetime.combine(day, time.min)
+    rows = (
+        TipsterTip.query
+        .filter(
+            TipsterTip.system_id.in_(list(stake_map)),
+            # a range on created_at, so the index on it can be used
+            TipsterTip.created_at >= start,
+            TipsterTip.created_at < start + timedelta(days=1)
+        )
+        .order_by(TipsterTip.id)
+        .all()
+    )
+    return [tip_payload(tip, stake_map[tip.system_id]) for tip in rows]
+
+
+def _render(tips):
+    body = json.dumps(tips, separators=(",", ":")).encode("utf-8")
+    return body, hashlib.sha1(body).hexdigest()
+
+
+def get_daily_tips(user_id, day=None):
+    """
+    Returns (JSON body, ETag) for the tips `user_id` may download today:
+    tips created that day on systems they follow, from tipsters who have
+    granted them access. Served from download_cache when fresh.
+    """
+    day = day or datetime.utcnow().date()
+    return download_cache.get_or_load((user_id, day), lambda: _render(_load_daily_tips(user_id, day)))
@@ -0,0 +1,201 @@
+import csv
+import json
+import logging
+import os
+from extensions import db
+from models import System, TipsterTip, FanoutJob
+from services.fanout import insert_tips, submit_fanout
+from services.tip_resolution import submit_resolution
+from services.tip_download import invalidate_downloads
+from services.tip_stream import publish_tips
+
+CHUNK_SIZE = int(os.getenv("TIP_IMPORT_CHUNK_SIZE", "500"))
+# Only the first errors are returned; the total is always counted
+MAX_REPORTED_ERRORS = int(os.getenv("TIP_IMPORT_MAX_ERRORS", "100"))
+
+REQUIRED_FIELDS = ("system_id", "race_time", "course", "horse")
+
+
+def _decode_lines(stream, bad_lines):
+    """
+    Yields each line of a binary stream decoded as UTF-8. A line that isn't
+    valid UTF-8 has its number appended to `bad_lines` and is yielded as a
+    blank line, so line numbers stay right and the line is skipped.
+    """
+    for line_no, line in enumerate(iter(stream.readline, b""), start=1):
+        try:
+            yield line.decode("utf-8")
+        except UnicodeDecodeError:
+            bad_lines.append(line_no)
+            yield "\n"
+
+
+def iter_ndjson(stream):
+    """Yields (line number, row dict or error string) for each non-blank NDJSON line."""
+    bad_lines = []
+    for line_no, line in enumerate(_decode_lines(stream, bad_lines), start=1):
+        if bad_lines:
+            yield bad_lines.pop(), "Line is not valid UTF-8"
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, f"Invalid JSON: {e}"
+            continue
+        yield line_no, row if isinstance(row, dict) else "Expected a JSON object"
+
+
+def iter_csv(stream):
+    """
+    Yields (line number, row dict or error string) for each CSV record after
+    the header line.
+    """
+    bad_lines = []
+    reader = csv.DictReader(_decode_lines(stream, bad_lines))
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            row = None
+        except csv.Error as e:
+            row = f"Invalid CSV: {e}"
+        while bad_lines:
+            yield bad_lines.pop(0), "Line is not valid UTF-8"
+        if row is None:
+            return
+        yield reader.line_num, row
+
+
+def _text(row, field, required=True):
+    """Returns row[field] stripped, checked against the column's type and length."""
+    value = row.get(field)
+    if value is None or value == "":
+        if required:
+            raise ValueError(f"Missing {field}")
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    value = value.strip()
+    max_length = getattr(TipsterTip, field).type.length
+    if len(value) > max_length:
+        raise ValueError(f"{field} is longer than {max_length} characters")
+    return value
+
+
+def _validate(row, owned_system_ids):
+    """Returns (system_id, tip) for a valid row, or raises ValueError with the reason."""
+    missing = [field for field in REQUIRED_FIELDS if row.get(field) in (None, "")]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+    system_id = row["system_id"]
+    if isinstance(system_id, str) and system_id.strip().isdigit():
+        system_id = int(system_id)
+    if isinstance(system_id, bool) or not isinstance(system_id, int):
+        raise ValueError(f"Invalid system_id '{row['system_id']}'")
+    if system_id not in owned_system_ids:
+        raise ValueError(f"System {system_id} not found or not owned by you")
+    race_time = _text(row, "race_time")
+    if TipsterTip.parse_race_time(race_time) is None:
+        raise ValueError(f"Unrecognised race_time '{race_time}'")
+    stake_type = _text(row, "stake_type", required=False) or "real"
+    if stake_type not in TipsterTip.STAKE_TYPES:
+        raise ValueError(f"stake_type must be one of {', '.join(TipsterTip.STAKE_TYPES)}")
+    return system_id, {
+        "race_time": race_time,
+        "course": _text(row, "course"),
+        "horse": _text(row, "horse"),
+        "stake_type": stake_type,
+    }
+
+
+def _write_chunk(chunk):
+    """
+    Inserts one chunk of {system_id: [tips]} and commits it with a fan-out
+    job per system that got new tips. Tips already uploaded are skipped.
+    Returns (tips created, fan-out job ids).
+    """
+    tip_ids = []
+    jobs = []
+    for system_id, tips in chunk.items():
+        ids = insert_tips(system_id, tips)
+        if ids:
+            jobs.append(FanoutJob(system_id=system_id, tip_ids=ids))
+            tip_ids.extend(ids)
+    db.session.add_all(jobs)
+    db.session.commit()
+    invalidate_downloads()
+    for job in jobs:
+        publish_tips(job.system_id, job.tip_ids)
+    submit_resolution(tip_ids)
+    for job in jobs:
+        submit_fanout(job.id)
+    return len(tip_ids), [job.id for job in jobs]
+
+
+def import_tips(rows, owner_id, chunk_size=None):
+    """
+    Imports tips from `rows`, an iterator of (line number, row dict or
+    error string), into systems owned by `owner_id`.
+
+    Rows are validated one at a time and written CHUNK_SIZE at a time, each
+    chunk in its own transaction, so memory stays flat however long the
+    upload is. Follower bets are created by the background fan-out jobs
+    returned. Invalid rows are skipped and reported with their line number.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    owned_system_ids = {
+        system_id for (system_id,) in
+        db.session.query(System.id).filter(System.user_id == owner_id)
+    }
+
+    chunk = {}
+    pending = 0
+    rows_read = 0
+    valid_rows = 0
+    tips_created = 0
+    job_ids = []
+    error_count = 0
+    errors = []
+
+    for line_no, row in rows:
+        rows_read += 1
+        try:
+            if isinstance(row, str):
+                raise ValueError(row)
+            system_id, tip = _validate(row, owned_system_ids)
+        except ValueError as e:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": line_no, "error": str(e)})
+            continue
+
+        chunk.setdefault(system_id, []).append(tip)
+        valid_rows += 1
+        pending += 1
+        if pending >= chunk_size:
+            tips, jobs = _write_chunk(chunk)
+            tips_created += tips
+            job_ids.extend(jobs)
+            chunk = {}
+            pending = 0
+
+    if pending:
+        tips, jobs = _write_chunk(chunk)
+        tips_created += tips
+        job_ids.extend(jobs)
+
+    logging.info(
+        "Tip import for user %s: %s rows, %s tips, %s fan-out jobs, %s errors",
+        owner_id, rows_read, tips_created, len(job_ids), error_count
+    )
+    return {
+        "rows": rows_read,
+        "tips_created": tips_created,
+        "duplicates": valid_rows - tips_created,
+        "fanout_job_ids": job_ids,
+        "error_count": error_count,
+        "errors": errors,
+        "errors_truncated": error_count > len(errors),
+    }
@@ -0,0 +1,166 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from flask import current_app
+from extensions import db
+from models import TipsterTip, SystemFollower, User
+from betfair import BetfairMarketLookup
+from betfair.oauth_session import OAuthSessionManager
+from betfair.placement_engine import PlacementEngine
+
+# Tips older than this are not retried: their races are long over
+LOOKBACK_HOURS = int(os.getenv("RESOLUTION_LOOKBACK_HOURS", "24"))
+# Followers tried, after the tipster, when the tipster has no usable Betfair session
+FALLBACK_ACCOUNTS = int(os.getenv("TIP_RESOLUTION_FALLBACK_ACCOUNTS", "3"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TIP_RESOLUTION_WORKERS", "2")),
+    thread_name_prefix="tip-resolver"
+)
+
+
+def _lookup(session_managers, course, race_start, horse):
+    """
+    Network half of a resolution; runs on an engine worker thread. Uses the
+    first of `session_managers` that can produce an access token.
+    """
+    token = None
+    for session_manager in session_managers:
+        token = session_manager.get_access_token()
+        if token:
+            break
+    if not token:
+        return {"error": "No Betfair session available to resolve tip"}
+
+    return BetfairMarketLookup(os.getenv("BETFAIR_CLIENT_ID"), token).find_market_and_selection(
+        BetfairMarketLookup.build_market_filter(course, race_start),
+        horse
+    )
+
+
+def _session_accounts(system):
+    """
+    Accounts whose Betfair session may be used to resolve `system`'s tips:
+    the owner, then up to FALLBACK_ACCOUNTS followers with a linked account,
+    freshest token first.
+    """
+    followers = (
+        User.query
+        .join(SystemFollower, SystemFollower.user_id == User.id)
+        .filter(
+            SystemFollower.system_id == system.id,
+            User.id != system.user_id,
+            User._betfair_refresh_token.isnot(None)
+        )
+        .order_by(User.betfair_token_expiry.desc())
+        .limit(FALLBACK_ACCOUNTS)
+        .all()
+    )
+    return [system.owner] + followers
+
+
+def _mark_failed(tip, error):
+    tip.resolution_status = 'failed'
+    tip.resolution_error = str(error)[:255]
+    logging.warning(
+        "Tip %s (%s %s %s) could not be resolved: %s",
+        tip.id, tip.race_time, tip.course, tip.horse, error
+    )
+
+
+def resolve_tips(tips, engine=None, commit=True):
+    """
+    Looks up and stores the Betfair market and selection IDs for `tips`,
+    using the system owner's Betfair session, or a follower's when the owner
+    has none (catalogue data is the same for every account). Tips that cannot be resolved
+    are flagged 'failed' with the reason. Returns (resolved, failed) counts.
+    Pass commit=False to leave the changes for the caller's transaction.
+    """
+    resolved = 0
+    failed = 0
+    managers = {}      # user id -> OAuthSessionManager, shared across systems
+    candidates = {}    # system id -> session managers to try, in order
+    tasks = []
+
+    for tip in tips:
+        if not tip.race_start:
+            _mark_failed(tip, f"Unrecognised race_time '{tip.race_time}'")
+            failed += 1
+            continue
+
+        if tip.system_id not in candidates:
+            accounts = _session_accounts(tip.system)
+            for user in accounts:
+                if user.id not in managers:
+                    managers[user.id] = OAuthSessionManager(user)
+            candidates[tip.system_id] = [managers[user.id] for user in accounts]
+
+        tasks.append((tip, tip.system.user_id, partial(
+            _lookup, candidates[tip.system_id], tip.course, tip.race_start, tip.horse
+        )))
+
+    results, _ = (engine or PlacementEngine()).run(tasks)
+
+    now = datetime.utcnow()
+    for tip, result in results:
+        if result.get("error"):
+            _mark_failed(tip, result["error"])
+            failed += 1
+            continue
+        tip.market_id = result["market_id"]
+        tip.selection_id = result["selection_id"]
+        tip.resolution_status = 'resolved'
+        tip.resolution_error = None
+        tip.resolved_at = now
+        resolved += 1
+
+    if commit:
+        db.session.commit()
+    return resolved, failed
+
+
+def _resolve_in_background(app, tip_ids):
+    with app.app_context():
+        try:
+            tips = TipsterTip.query.filter(TipsterTip.id.in_(tip_ids)).all()
+            resolved, failed = resolve_tips(tips)
+            logging.info("Resolved %s uploaded tips, %s failed", resolved, failed)
+        except Exception:
+            logging.exception("Background tip resolution failed for tips %s", tip_ids)
+            db.session.rollback()
+
+
+def submit_resolution(tip_ids):
+    """
+    Queues `tip_ids` for resolution on the background pool and returns
+    immediately. Must be called from inside a Flask app context.
+    """
+    if tip_ids:
+        _executor.submit(_resolve_in_background, current_app._get_current_object(), list(tip_ids))
+
+
+def resolve_unresolved_tips(now=None, tip_ids=None):
+    """
+    Retries pending or failed tips whose race has not started yet. Only
+    tips created within the last RESOLUTION_LOOKBACK_HOURS are read, so the
+    cost doesn't grow with the tip table. Pass `tip_ids` to retry only
+    those tips (e.g. one race, just before it is placed).
+    """
+    now = now or datetime.utcnow()
+    query = TipsterTip.query.filter(
+        TipsterTip.created_at >= now - timedelta(hours=LOOKBACK_HOURS),
+        db.or_(
+            TipsterTip.resolution_status.is_(None),
+            TipsterTip.resolution_status.in_(('pending', 'failed'))
+        )
+    )
+    if tip_ids is not None:
+        query = query.filter(TipsterTip.id.in_(list(tip_ids)))
+    tips = [tip for tip in query.all() if tip.race_start and tip.race_start > now]
+    resolved, failed = resolve_tips(tips)
+    return {
+        "message": f"{resolved} tips resolved, {failed} still unresolved.",
+        "stats": {"market_cache": BetfairMarketLookup.cache_stats()}
+    }
@@ -0,0 +1,163 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from extensions import db
+from models import TipsterTip
+from services.tip_download import permitted_systems, tip_payload
+
+KEEPALIVE_SECONDS = float(os.getenv("TIP_STREAM_KEEPALIVE_SECONDS", "15"))
+# How often an open stream re-checks access and catches up from the database,
+# which also picks up tips uploaded through other worker processes
+POLL_SECONDS = float(os.getenv("TIP_STREAM_POLL_SECONDS", "30"))
+QUEUE_SIZE = int(os.getenv("TIP_STREAM_QUEUE_SIZE", "256"))
+BACKFILL_LIMIT = int(os.getenv("TIP_STREAM_BACKFILL_LIMIT", "500"))
+# Sent as the SSE "retry:" field: how long a client waits before reconnecting
+RECONNECT_MS = int(os.getenv("TIP_STREAM_RECONNECT_MS", "5000"))
+
+
+class Subscription:
+    def __init__(self, system_ids):
+        self.system_ids = frozenset(system_ids)
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        # set when an event had to be dropped; the stream then catches up from the database
+        self.overflowed = False
+
+
+class TipHub:
+    """
+    In-process publish/subscribe of uploaded tips, keyed by system id.
+    Each open stream holds one Subscription; publishing never blocks on a
+    slow client.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, system_ids):
+        subscription = Subscription(system_ids)
+        with self._lock:
+            for system_id in subscription.system_ids:
+                self._subscribers[system_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for system_id in subscription.system_ids:
+                subscribers = self._subscribers.get(system_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[system_id]
+
+    def resubscribe(self, subscription, system_ids):
+        """Moves `subscription` to a new set of systems, keeping its queue."""
+        self.unsubscribe(subscription)
+        subscription.system_ids = frozenset(system_ids)
+        with self._lock:
+            for system_id in subscription.system_ids:
+                self._subscribers[system_id].add(subscription)
+
+    def watching(self, system_id):
+        with self._lock:
+            return bool(self._subscribers.get(system_id))
+
+    def publish(self, system_id, tips):
+        with self._lock:
+            subscribers = list(self._subscribers.get(system_id, ()))
+        for subscription in subscribers:
+            for tip in tips:
+                try:
+                    subscription.queue.put_nowait(tip)
+                except queue.Full:
+                    subscription.overflowed = True
+                    break
+
+
+hub = TipHub()
+
+
+def publish_tips(system_id, tip_ids):
+    """
+    Pushes newly committed tips to the streams watching `system_id`. Costs
+    nothing when nobody is watching; otherwise one query shared by all of
+    them.
+    """
+    if not tip_ids or not hub.watching(system_id):
+        return
+    tips = TipsterTip.query.filter(TipsterTip.id.in_(list(tip_ids))).order_by(TipsterTip.id).all()
+    hub.publish(system_id, [tip_payload(tip, None) for tip in tips])
+
+
+def _tips_after(system_ids, last_id):
+    if not system_ids:
+        return []
+    return (
+        TipsterTip.query
+        .filter(TipsterTip.system_id.in_(list(system_ids)), TipsterTip.id > last_id)
+        .order_by(TipsterTip.id)
+        .limit(BACKFILL_LIMIT)
+        .all()
+    )
+
+
+def _event(tip):
+    return f"id: {tip['tip_id']}\nevent: tip\ndata: {json.dumps(tip)}\n\n"
+
+
+def stream_tips(user_id, last_event_id=None, is_authorized=None):
+    """
+    Generator of Server-Sent Events carrying each new tip `user_id` may
+    download, with the tip id as the event id. With `last_event_id` (the
+    browser's Last-Event-ID) tips after it are replayed from the database
+    first; without it the stream starts at the newest tip. Must run inside
+    the request's app context (stream_with_context).
+
+    `is_authorized()` is rechecked on every poll along with access; once it
+    returns false (e.g. the token expired or was revoked) an "unauthorized"
+    event is sent and the stream ends.
+    """
+    stake_map = permitted_systems(user_id)
+    subscription = hub.subscribe(stake_map)
+    try:
+        if last_event_id is None:
+            last_event_id = db.session.query(db.func.max(TipsterTip.id)).scalar() or 0
+        last_id = last_event_id
+        next_poll = 0.0
+
+        yield f"retry: {RECONNECT_MS}\n\n"
+        while True:
+            if subscription.overflowed or time.monotonic() >= next_poll:
+                subscription.overflowed = False
+                if is_authorized is not None and not is_authorized():
+                    yield 'event: unauthorized\ndata: {"message": "Token expired or revoked"}\n\n'
+                    return
+                stake_map = permitted_systems(user_id)
+                if set(stake_map) != subscription.system_ids:
+                    hub.resubscribe(subscription, stake_map)
+                tips = _tips_after(stake_map, last_id)
+                for tip in tips:
+                    last_id = tip.id
+                    yield _event(tip_payload(tip, stake_map[tip.system_id]))
+                # don't hold a pooled connection while idle
+                db.session.close()
+                # a full page means more to replay: go straight back for it
+                next_poll = 0.0 if len(tips) == BACKFILL_LIMIT else time.monotonic() + POLL_SECONDS
+                if not next_poll:
+                    continue
+
+            try:
+                tip = subscription.queue.get(timeout=KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            if tip["tip_id"] <= last_id or tip["system_id"] not in stake_map:
+                continue
+            last_id = tip["tip_id"]
+            yield _event(dict(tip, stake=stake_map[tip["system_id"]]))
+    finally:
+        hub.unsubscribe(subscription)
+        db.session.close()
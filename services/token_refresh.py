@@ -0,0 +1,67 @@
+import logging
+import os
+from datetime import datetime, timedelta
+from functools import partial
+from extensions import db
+from models import User
+from betfair.oauth_session import OAuthSessionManager
+from betfair.placement_engine import PlacementEngine
+
+LOOKAHEAD_SECONDS = int(os.getenv("TOKEN_REFRESH_LOOKAHEAD_SECONDS", "900"))
+CONCURRENCY = int(os.getenv("TOKEN_REFRESH_CONCURRENCY", "8"))
+BATCH_SIZE = int(os.getenv("TOKEN_REFRESH_BATCH_SIZE", "200"))
+
+
+def _refresh(session_manager):
+    """Network half of a refresh; runs on an engine worker thread."""
+    if session_manager.refresh_access_token():
+        return {"success": True}
+    return {"error": "refresh failed"}
+
+
+def refresh_expiring_tokens(lookahead_seconds=None, concurrency=None, batch_size=None, now=None):
+    """
+    Refreshes Betfair access tokens that expire within the look-ahead window.
+
+    Only accounts whose betfair_token_expiry falls before the cutoff are
+    read, via the index on that column, in id-ordered batches. Each batch is
+    refreshed concurrently (at most `concurrency` calls to the identity
+    endpoint at once) and committed once.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now + timedelta(seconds=lookahead_seconds or LOOKAHEAD_SECONDS)
+    engine = PlacementEngine(max_workers=concurrency or CONCURRENCY, per_user_limit=1)
+    refreshed = 0
+    failed = 0
+
+    last_id = 0
+    while True:
+        users = (
+            User.query
+            .filter(
+                User.betfair_token_expiry <= cutoff,
+                User._betfair_refresh_token.isnot(None),
+                User.id > last_id
+            )
+            .order_by(User.id)
+            .limit(batch_size or BATCH_SIZE)
+            .all()
+        )
+        if not users:
+            break
+        last_id = users[-1].id
+
+        results, stats = engine.run(
+            (user.id, user.id, partial(_refresh, OAuthSessionManager(user)))
+            for user in users
+        )
+        db.session.commit()
+
+        batch_refreshed = sum(1 for _, result in results if result.get("success"))
+        refreshed += batch_refreshed
+        failed += len(results) - batch_refreshed
+        logging.info("Token refresh batch up to user %s: %s", last_id, stats.to_dict())
+
+    return {
+        "message": f"{refreshed} tokens refreshed, {failed} failed (expiring before {cutoff.isoformat()})"
+    }
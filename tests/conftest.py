@@ -0,0 +1,7 @@
+import os
+import sys
+
+# run against an in-memory database, with the repository root importable
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,45 @@
+from app import app
+from extensions import db
+from db_helpers import QueryCounter
+from models import User, System, SystemFollower, UserBet
+from services.fanout import insert_tips, sync_system_bets
+
+
+def _make_system(size):
+    """A system with `size` follower users and `size` tips, missing the bets of every other tip."""
+    owner = User(email=f"owner{size}@example.com", password="x")
+    followers = [User(email=f"follower{size}-{i}@example.com", password="x") for i in range(size)]
+    db.session.add_all([owner] + followers)
+    db.session.flush()
+    system = System(user_id=owner.id, name=f"System {size}", system_type="back", staking_plan="level", bank=100)
+    db.session.add(system)
+    db.session.flush()
+    db.session.add_all([
+        SystemFollower(user_id=follower.id, system_id=system.id, stake=1.0, bank=100.0) for follower in followers
+    ])
+    tip_ids = insert_tips(system.id, [
+        {"race_time": "2030-01-01 14:00", "course": "Ascot", "horse": f"Horse {i}"} for i in range(size)
+    ])
+    sync_system_bets(system.id)
+    db.session.execute(db.delete(UserBet).where(UserBet.tip_id.in_(tip_ids[::2])))
+    db.session.commit()
+    return system.id
+
+
+def _sync_queries(size):
+    system_id = _make_system(size)
+    with QueryCounter(db.engine) as counter:
+        created = sync_system_bets(system_id)
+        db.session.commit()
+    assert created == size * len(range(0, size, 2))
+    return counter.queries
+
+
+def test_sync_query_count_is_independent_of_system_size():
+    with app.app_context():
+        db.create_all()
+        try:
+            assert _sync_queries(5) == _sync_queries(50)
+        finally:
+            db.session.remove()
+            db.drop_all()